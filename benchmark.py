@@ -0,0 +1,180 @@
+"""
+Benchmark solver configurations over instances with fixed seeds and time budgets.
+
+Example:
+    python benchmark.py --instances "PublicInstances/wlp0*.dzn" --configs sa tempering --seeds 0 1 --minutes 1
+
+Every run happens in a fresh process, so its peak RSS is its own. Results are
+written as JSON (one record per instance/config/seed) and summarised on stdout.
+"""
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from parser import parse_file
+from simulated_annealing import simulated_annealing
+from multistart import multi_start_annealing
+from parallel_tempering import parallel_tempering
+from solution import load_solution
+from validator import validate_solution
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+SOLVERS = {
+    'sa': (simulated_annealing, 'seed'),
+    'multistart': (multi_start_annealing, 'base_seed'),
+    'tempering': (parallel_tempering, 'seed'),
+}
+
+# name -> (solver, parameters); the time budget and seed are added per run
+CONFIGS = {
+    'sa': ('sa', {'max_iterations': None}),
+    'sa-50k': ('sa', {'max_iterations': 50000}),
+    'sa-adaptive': ('sa', {'max_iterations': None, 'adaptive_operators': True}),
+    'multistart': ('multistart', {'num_workers': 4, 'max_iterations': None}),
+    'tempering': ('tempering', {'num_replicas': 4}),
+}
+
+DEFAULT_TARGETS = [10, 5, 2, 1, 0]  # Percent above the best-known cost
+
+def best_known_cost(problem, instance_path, solutions_dir='solutions'):
+    """Cost of solutions/<instance>/solution.txt, or None if it is missing or invalid."""
+    name = os.path.splitext(os.path.basename(instance_path))[0]
+    solution_file = os.path.join(solutions_dir, name, 'solution.txt')
+    if not os.path.exists(solution_file):
+        return None
+    try:
+        solution = load_solution(problem, solution_file)
+    except ValueError:
+        return None
+    is_valid, _ = validate_solution(problem, solution)
+    return solution.cost() if is_valid else None
+
+def _peak_rss_kb(children=False):
+    """Peak resident set size of this process (or of its largest finished child), in KB on Linux."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+
+def run_once(instance_path, config_name, seed, time_limit_minutes, targets, solutions_dir='solutions'):
+    """Parse, solve and measure one (instance, config, seed) combination."""
+    solver_name, params = CONFIGS[config_name]
+    solver, seed_param = SOLVERS[solver_name]
+
+    parse_start = time.perf_counter()
+    problem = parse_file(instance_path)
+    parse_seconds = time.perf_counter() - parse_start
+    best_known = best_known_cost(problem, instance_path, solutions_dir)
+
+    history = []
+
+    def on_improvement(iteration, elapsed_seconds, cost):
+        history.append((elapsed_seconds, cost))
+
+    stats = {}
+    solve_start = time.perf_counter()
+    best = solver(problem, time_limit_minutes=time_limit_minutes, verbose=False,
+                  on_improvement=on_improvement, stats=stats, **{seed_param: seed}, **params)
+    solve_seconds = time.perf_counter() - solve_start
+    is_valid, message = validate_solution(problem, best)
+
+    time_to_target = {}
+    if best_known is not None:
+        for percent in targets:
+            target = best_known * (1 + percent / 100)
+            time_to_target[f"{percent:g}"] = next((elapsed for elapsed, cost in history if cost <= target), None)
+
+    elapsed = stats.get('elapsed_seconds') or solve_seconds
+    return {
+        'instance': os.path.basename(instance_path),
+        'config': config_name,
+        'solver': solver_name,
+        'params': params,
+        'seed': seed,
+        'time_limit_minutes': time_limit_minutes,
+        'parse_seconds': parse_seconds,
+        'solve_seconds': solve_seconds,
+        'iterations': stats.get('iterations'),
+        'moves_evaluated': stats.get('moves_evaluated'),
+        'moves_accepted': stats.get('moves_accepted'),
+        'iterations_per_second': stats.get('iterations', 0) / elapsed if elapsed else None,
+        'moves_evaluated_per_second': stats.get('moves_evaluated', 0) / elapsed if elapsed else None,
+        'peak_rss_kb': _peak_rss_kb(),
+        'peak_rss_children_kb': _peak_rss_kb(children=True),
+        'cost': best.cost(),
+        'valid': is_valid,
+        'validation_message': message,
+        'best_known_cost': best_known,
+        'gap_percent': (best.cost() - best_known) / best_known * 100 if best_known else None,
+        'time_to_target_seconds': time_to_target,
+        'history': history,
+    }
+
+def run_benchmarks(instance_paths, config_names, seeds, time_limit_minutes, targets=DEFAULT_TARGETS, solutions_dir='solutions'):
+    """Run every combination sequentially, each in its own spawned process, and return the records."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for instance_path in instance_paths:
+        for config_name in config_names:
+            for seed in seeds:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    record = pool.submit(run_once, instance_path, config_name, seed, time_limit_minutes,
+                                         targets, solutions_dir).result()
+                results.append(record)
+                print(format_row(record))
+    return results
+
+def format_row(record):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+
+    ttt = record['time_to_target_seconds']
+    closest = next((f"{p}%@{ttt[p]:.1f}s" for p in sorted(ttt, key=float) if ttt[p] is not None), '-')
+    return (f"{record['instance']:<12} {record['config']:<12} seed={record['seed']:<3} "
+            f"cost={record['cost']:<8} gap={fmt(record['gap_percent'], '.2f')}% "
+            f"it/s={fmt(record['iterations_per_second'], '.0f')} moves/s={fmt(record['moves_evaluated_per_second'], '.0f')} "
+            f"parse={record['parse_seconds'] * 1000:.1f}ms rss={fmt(record['peak_rss_kb'], 'd')}KB "
+            f"best-target={closest} valid={record['valid']}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--instances', nargs='+', default=['PublicInstances/*.dzn'], help='instance paths or globs')
+    arg_parser.add_argument('--configs', nargs='+', default=['sa'], choices=sorted(CONFIGS))
+    arg_parser.add_argument('--seeds', nargs='+', type=int, default=[0])
+    arg_parser.add_argument('--minutes', type=float, default=1.0, help='time budget per run')
+    arg_parser.add_argument('--targets', nargs='+', type=float, default=DEFAULT_TARGETS,
+                            help='time-to-target thresholds, in percent above the best-known cost')
+    arg_parser.add_argument('--solutions-dir', default='solutions')
+    arg_parser.add_argument('--output', default=None, help='JSON file (default: tmp/benchmarks/<timestamp>.json)')
+    args = arg_parser.parse_args()
+
+    instance_paths = sorted({path for pattern in args.instances for path in glob.glob(pattern)})
+    if not instance_paths:
+        arg_parser.error(f"No instances match {args.instances}")
+
+    started = datetime.datetime.now()
+    results = run_benchmarks(instance_paths, args.configs, args.seeds, args.minutes, args.targets, args.solutions_dir)
+
+    output = args.output or f"tmp/benchmarks/{started.strftime('%Y%m%d-%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'started': started.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'arguments': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Checkpoints of a simulated annealing run: the current and best solutions, the
+temperature, the iteration count, the elapsed time and the state of the random
+module, stored in a compressed .npz so an interrupted run can be resumed.
+"""
+import os
+import random
+import numpy as np
+from solution import solution_state, solution_from_state
+
+class Checkpoint:
+    def __init__(self, current, best, T, iteration, elapsed_seconds, random_state, finished=False):
+        self.current = current
+        self.best = best
+        self.T = T
+        self.iteration = iteration
+        self.elapsed_seconds = elapsed_seconds
+        self.random_state = random_state
+        self.finished = finished  # Saved at the normal end of a run, so there is nothing to resume
+
+# Entries of solution_state and the number of columns of each
+_STATE_COLUMNS = {'assignments': 3, 'warehouse_order': 2, 'split_stores': 1, 'mergeable_stores': 1, 'open_set': 1}
+
+def _state_arrays(prefix, solution):
+    state = solution_state(solution)
+    return {
+        f"{prefix}_{name}": np.asarray(state[name], dtype=np.int32).reshape(-1, columns)
+        for name, columns in _STATE_COLUMNS.items()
+    }
+
+def _load_state(prefix, data, problem):
+    state = {}
+    for name, columns in _STATE_COLUMNS.items():
+        rows = data[f"{prefix}_{name}"].tolist()
+        state[name] = [row[0] for row in rows] if columns == 1 else rows
+    return solution_from_state(problem, state)
+
+def save_checkpoint(file_path, current, best, T, iteration, elapsed_seconds, finished=False):
+    """
+    Write the annealer state to file_path; the previous checkpoint is replaced
+    atomically. finished marks the state at the normal end of a run.
+    """
+    version, internal_state, gauss_next = random.getstate()
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so a crash mid-write keeps the previous checkpoint
+    tmp_file = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as file:
+        np.savez_compressed(
+            file,
+            **_state_arrays('current', current), **_state_arrays('best', best),
+            T=np.float64(T), iteration=np.int64(iteration), elapsed_seconds=np.float64(elapsed_seconds),
+            random_version=np.int64(version), random_internal=np.asarray(internal_state, dtype=np.uint64),
+            random_gauss=np.float64(np.nan if gauss_next is None else gauss_next), finished=np.bool_(finished)
+        )
+    os.replace(tmp_file, file_path)
+
+def load_checkpoint(file_path, problem):
+    """Read a checkpoint written by save_checkpoint for `problem`."""
+    with np.load(file_path) as data:
+        gauss_next = float(data['random_gauss'])
+        random_state = (
+            int(data['random_version']),
+            tuple(int(x) for x in data['random_internal']),
+            None if np.isnan(gauss_next) else gauss_next
+        )
+        return Checkpoint(
+            _load_state('current', data, problem), _load_state('best', data, problem),
+            float(data['T']), int(data['iteration']), float(data['elapsed_seconds']), random_state,
+            # Checkpoints from before the flag existed are treated as unfinished
+            bool(data['finished']) if 'finished' in data.files else False
+        )
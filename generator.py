@@ -0,0 +1,117 @@
+"""
+Seeded generator of synthetic instances in the .dzn format of PublicInstances.
+
+Example:
+    python generator.py tmp/instances/big.dzn --warehouses 2500 --stores 6000 --seed 1
+
+The defaults follow the public instances: capacities of 30-100, demands of
+5-20, fixed costs of about 10 per unit of capacity, supply costs up to about
+140, and about 30 incompatible stores per store. The SupplyCost matrix is
+generated and written a block of rows at a time, so instances far larger
+than wlp05 do not need the whole matrix in memory.
+"""
+import argparse
+import os
+import numpy as np
+
+COST_STRUCTURES = ('euclidean', 'uniform')
+ROW_BLOCK = 1024
+
+def _capacities(rng, num_warehouses, total_demand, tightness):
+    """Capacities of 30-100 in steps of 10, scaled so they add up to total_demand / tightness."""
+    capacity = rng.integers(3, 11, num_warehouses) * 10
+    scale = total_demand / tightness / capacity.sum()
+    return np.maximum(np.rint(capacity * scale), 1).astype(np.int64)
+
+def _incompatible_pairs(rng, num_stores, incompatibility_degree):
+    """Distinct (a, b) store pairs with a < b, sorted, with each store in about incompatibility_degree pairs."""
+    max_pairs = num_stores * (num_stores - 1) // 2
+    target = min(int(round(num_stores * incompatibility_degree / 2)), max_pairs)
+    keys = np.empty(0, dtype=np.int64)
+    while len(keys) < target:
+        a = rng.integers(0, num_stores, 2 * (target - len(keys)) + 16)
+        b = rng.integers(0, num_stores, len(a))
+        a, b = np.minimum(a, b), np.maximum(a, b)
+        keep = a != b
+        keys = np.unique(np.concatenate((keys, a[keep] * num_stores + b[keep])))
+    keys = np.sort(rng.choice(keys, target, replace=False)) if len(keys) > target else keys
+    return np.stack((keys // num_stores, keys % num_stores), axis=1)
+
+def _supply_cost_rows(rng, cost_structure, max_cost, store_points, warehouse_points, start, stop):
+    """Rows start:stop of the SupplyCost matrix."""
+    if cost_structure == 'uniform':
+        return rng.integers(0, max_cost + 1, (stop - start, len(warehouse_points)))
+    # Distance on the unit square scaled so the farthest pair costs about max_cost, plus noise
+    distance = np.linalg.norm(store_points[start:stop, None, :] - warehouse_points[None, :, :], axis=2)
+    noise = rng.normal(0, max_cost * 0.05, distance.shape)
+    return np.clip(np.rint(distance / np.sqrt(2) * max_cost + noise), 0, None).astype(np.int64)
+
+def _format_list(values):
+    return ", ".join(map(str, values.tolist()))
+
+def generate_instance(file_path, num_warehouses, num_stores, seed=0, tightness=0.45,
+                      cost_structure='euclidean', max_supply_cost=140, fixed_cost_per_unit=10,
+                      incompatibility_degree=30):
+    """
+    Write a random instance to file_path and return the number of incompatible pairs.
+
+    - tightness: total demand over total capacity (about 0.45 in the public instances)
+    - cost_structure: 'euclidean' places stores and warehouses on the unit square and makes
+      the supply cost grow with the distance; 'uniform' draws every supply cost independently
+    - max_supply_cost: largest supply cost (up to noise for 'euclidean')
+    - fixed_cost_per_unit: mean fixed cost per unit of capacity (+-30%, rounded to tens)
+    - incompatibility_degree: mean number of stores each store is incompatible with
+    The same arguments and seed always give the same file.
+    """
+    if cost_structure not in COST_STRUCTURES:
+        raise ValueError(f"Unknown cost structure: {cost_structure}")
+    rng = np.random.default_rng(seed)
+    demand = rng.integers(5, 21, num_stores)
+    capacity = _capacities(rng, num_warehouses, demand.sum(), tightness)
+    fixed_cost = np.rint(capacity * fixed_cost_per_unit * rng.uniform(0.7, 1.3, num_warehouses) / 10).astype(np.int64) * 10
+    pairs = _incompatible_pairs(rng, num_stores, incompatibility_degree) + 1
+    store_points = rng.random((num_stores, 2))
+    warehouse_points = rng.random((num_warehouses, 2))
+
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, 'w', buffering=1 << 20) as f:
+        f.write(f"Warehouses = {num_warehouses};\nStores = {num_stores};\n\n")
+        f.write(f"Capacity = [{_format_list(capacity)}];\n")
+        f.write(f"FixedCost = [{_format_list(fixed_cost)}];\n")
+        f.write(f"Goods = [{_format_list(demand)}];\n")
+        f.write("SupplyCost = [")
+        for start in range(0, num_stores, ROW_BLOCK):
+            stop = min(start + ROW_BLOCK, num_stores)
+            rows = _supply_cost_rows(rng, cost_structure, max_supply_cost, store_points, warehouse_points, start, stop)
+            separator = "|" if start == 0 else "\n              |"
+            f.write(separator + "\n              |".join(_format_list(row) for row in rows))
+        f.write("|];\n\n")
+        f.write(f"Incompatibilities = {len(pairs)};\n")
+        f.write("IncompatiblePairs = [|")
+        f.write("".join(f" {a}, {b} |" for a, b in pairs.tolist()))
+        f.write("];\n")
+    return len(pairs)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('output', help='.dzn file to write')
+    arg_parser.add_argument('--warehouses', type=int, required=True)
+    arg_parser.add_argument('--stores', type=int, required=True)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--tightness', type=float, default=0.45, help='total demand / total capacity')
+    arg_parser.add_argument('--cost-structure', choices=COST_STRUCTURES, default='euclidean')
+    arg_parser.add_argument('--max-supply-cost', type=int, default=140)
+    arg_parser.add_argument('--fixed-cost-per-unit', type=float, default=10)
+    arg_parser.add_argument('--incompatibility-degree', type=float, default=30,
+                            help='mean number of incompatible stores per store')
+    args = arg_parser.parse_args()
+
+    num_pairs = generate_instance(args.output, args.warehouses, args.stores, args.seed, args.tightness,
+                                  args.cost_structure, args.max_supply_cost, args.fixed_cost_per_unit,
+                                  args.incompatibility_degree)
+    print(f"Wrote {args.output}: {args.warehouses} warehouses, {args.stores} stores, {num_pairs} incompatible pairs")
+
+if __name__ == "__main__":
+    main()
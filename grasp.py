@@ -0,0 +1,99 @@
+"""
+GRASP stage: many randomized greedy constructions, each polished by steepest
+descent, built in parallel worker processes. The best of them are kept in an
+elite pool of diverse solutions that the annealers start from.
+"""
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from initial_solution import generate_initial_solution_with_heap
+from local_search import polish
+from validator import validate_solution
+from workers import init_worker, worker_problem, rebuild_solution
+
+def _construct(seed, randomization_range, polish_seconds):
+    """One randomized construction and its polish; returns (seed, cost, assignments), or None if invalid."""
+    random.seed(seed)
+    problem = worker_problem()
+    solution = generate_initial_solution_with_heap(problem, randomization=random.uniform(*randomization_range))
+    if not validate_solution(problem, solution)[0]:
+        return seed, None, None
+    polish(solution, time_limit_seconds=polish_seconds)
+    return seed, solution.cost(), solution.assignments
+
+class ElitePool:
+    """
+    The best `size` solutions seen, kept apart by at least `min_distance`:
+    the number of warehouses open in exactly one of two solutions. A solution
+    too close to some members replaces all of them, and only if it is cheaper
+    than each.
+    """
+    def __init__(self, size=10, min_distance=2):
+        self.size = size
+        self.min_distance = min_distance
+        self.members = []  # Sorted by cost
+
+    @staticmethod
+    def distance(a, b):
+        return len(set(a.open_set.items).symmetric_difference(b.open_set.items))
+
+    def add(self, solution):
+        """Offer a solution to the pool; returns True if it was kept."""
+        cost = solution.cost()
+        close = [member for member in self.members if self.distance(solution, member) < self.min_distance]
+        if close:
+            # Replacing only some of them would leave the newcomer too close to the rest
+            if any(cost >= member.cost() for member in close):
+                return False
+            self.members = [member for member in self.members if member not in close]
+        elif len(self.members) >= self.size:
+            if cost >= self.members[-1].cost():
+                return False
+            self.members.pop()
+        self.members.append(solution)
+        self.members.sort(key=lambda member: member.cost())
+        return True
+
+    def best(self):
+        return self.members[0] if self.members else None
+
+    def __len__(self):
+        return len(self.members)
+
+def grasp(problem, num_constructions=200, pool_size=10, num_workers=None, base_seed=0, randomization_range=(0.1, 0.5),
+          polish_seconds=0.5, min_distance=2, time_limit_seconds=None, verbose=True):
+    """
+    Build `num_constructions` randomized heap-greedy solutions (see
+    generate_initial_solution_with_heap) in a process pool, polish each for at
+    most polish_seconds, and return the ElitePool of the best diverse ones.
+
+    Construction i uses seed base_seed + i and a randomization drawn from
+    randomization_range. Constructions still queued when time_limit_seconds
+    runs out are cancelled.
+    """
+    start_time = time.time()
+    num_workers = min(num_workers or os.cpu_count() or 1, num_constructions)
+    pool = ElitePool(pool_size, min_distance)
+    built = invalid = 0
+
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(problem,)) as executor:
+        futures = [executor.submit(_construct, base_seed + i, randomization_range, polish_seconds)
+                   for i in range(num_constructions)]
+        for future in as_completed(futures):
+            seed, cost, assignments = future.result()
+            built += 1
+            if assignments is None:
+                invalid += 1
+            elif pool.add(rebuild_solution(assignments, problem)) and verbose and pool.best().cost() == cost:
+                print(f"GRASP: new best {cost} (seed {seed}, {built}/{num_constructions} built)")
+            if time_limit_seconds is not None and time.time() - start_time >= time_limit_seconds:
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    if verbose:
+        costs = [member.cost() for member in pool.members]
+        print(f"GRASP: {built} constructions ({invalid} invalid) in {time.time() - start_time:.1f}s, "
+              f"elite costs {costs}")
+    return pool
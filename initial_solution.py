@@ -1,5 +1,6 @@
+import heapq
 import random
-from solution import Solution
+import numpy as np
 from solution import Solution
 from utils import order_stores_by_demand, order_warehouses_by_cost_efficiency
 
@@ -16,20 +17,23 @@ def generate_initial_solution(problem, ordering_operator="random"):
     warehouses = problem.get_warehouses()
     supply_cost = problem.get_supply_cost()
 
-    warehouse_stores = {wh_id: set() for wh_id in range(len(warehouses))}
-
     store_ids = list(range(len(stores)))
     warehouse_ids = list(range(len(warehouses)))  # Define this early
+    swapped = None
 
     if ordering_operator == "demand":
         store_ids = order_stores_by_demand(stores)
     elif ordering_operator == "random":
+        # Swap two warehouses in the visiting order (the problem itself is never modified)
         if len(warehouse_ids) > 1:
-            wh1, wh2 = random.sample(warehouse_ids, 2)
-            warehouses[wh1], warehouses[wh2] = warehouses[wh2], warehouses[wh1]
+            swapped = random.sample(warehouse_ids, 2)
     elif ordering_operator != "cost_efficiency":
         raise ValueError("Invalid ordering operator. Choose 'demand', 'cost_efficiency', or 'random'.")
 
+    warehouse_ids = order_warehouses_by_cost_efficiency(warehouses)
+    if swapped:
+        i, j = warehouse_ids.index(swapped[0]), warehouse_ids.index(swapped[1])
+        warehouse_ids[i], warehouse_ids[j] = warehouse_ids[j], warehouse_ids[i]
 
     for store_id in store_ids:
         store = stores[store_id]
@@ -39,35 +43,31 @@ def generate_initial_solution(problem, ordering_operator="random"):
             best_wh = -1
             best_cost = float('inf')
 
-            warehouse_ids = order_warehouses_by_cost_efficiency(warehouses)
+            # Try the store's candidate warehouses first, and all of them only if none fits
+            for scanned in (solution.candidate_warehouses(store_id), warehouse_ids):
+                for wh_id in scanned:
+                    warehouse = warehouses[wh_id]
+                    remaining_capacity = solution.get_remaining_capacity(wh_id)
+                    if remaining_capacity > 0:
+                        if not solution.is_compatible(store_id, wh_id):
+                            continue
 
-            for wh_id in warehouse_ids:
-                warehouse = warehouses[wh_id]
-                remaining_capacity = warehouse.get_remaining_capacity()
-                if remaining_capacity > 0:
-                    incompatible = any(
-                        store_id in stores[assigned_store_id].incompatible_stores
-                        for assigned_store_id in warehouse_stores[wh_id]
-                    )
+                        cost = supply_cost[store_id][wh_id]
 
-                    if incompatible:
-                        continue
+                        if not solution.is_open(wh_id):
+                            expected_usage = min(demand, remaining_capacity)
+                            amortized_fixed_cost = warehouse.fixed_cost / expected_usage
+                            cost += amortized_fixed_cost
 
-                    cost = supply_cost[store_id][wh_id]
-
-                    if not warehouse.is_open:
-                        expected_usage = min(demand, remaining_capacity)
-                        amortized_fixed_cost = warehouse.fixed_cost / expected_usage
-                        cost += amortized_fixed_cost
-
-                    if cost < best_cost:
-                        best_cost = cost
-                        best_wh = wh_id
+                        if cost < best_cost:
+                            best_cost = cost
+                            best_wh = wh_id
+                if best_wh != -1:
+                    break
 
             if best_wh != -1:
-                quantity = min(demand, warehouses[best_wh].get_remaining_capacity())
+                quantity = min(demand, solution.get_remaining_capacity(best_wh))
                 solution.add_assignment(store_id, best_wh, quantity)
-                warehouse_stores[best_wh].add(store_id)
                 demand -= quantity
             else:
                 print(f"Warning: Could not assign all demand for store {store_id+1} due to constraints")
@@ -90,14 +90,10 @@ def generate_initial_solution_with_randomization(problem, randomization=0.3):
     warehouses = problem.get_warehouses()
     supply_cost = problem.get_supply_cost()
 
-    warehouse_stores = {wh_id: set() for wh_id in range(len(warehouses))}
-    
     # Create store priorities based on both demand and cost
-    store_priorities = []
-    for store_id, store in enumerate(stores):
-        avg_cost = sum(supply_cost[store_id]) / len(supply_cost[store_id])
-        priority = store.demand * avg_cost
-        store_priorities.append((store_id, priority))
+    arrays = problem.get_arrays()
+    priorities = arrays.demand * arrays.supply_cost.mean(axis=1)
+    store_priorities = list(enumerate(priorities.tolist()))
     
     store_priorities.sort(key=lambda x: x[1], reverse=True)
     if randomization > 0:
@@ -117,33 +113,32 @@ def generate_initial_solution_with_randomization(problem, randomization=0.3):
         while demand > 0:
             valid_warehouses = []
             
-            for wh_id in range(len(warehouses)):
-                warehouse = warehouses[wh_id]
-                remaining_capacity = warehouse.get_remaining_capacity()
-                
-                if remaining_capacity <= 0:
-                    continue
-                
-                incompatible = any(
-                    store_id in stores[assigned_store_id].incompatible_stores
-                    for assigned_store_id in warehouse_stores[wh_id]
-                )
-                
-                if incompatible:
-                    continue
-                
-                # Calculate total cost (supply cost + fixed cost if not open)
-                cost = supply_cost[store_id][wh_id]
-                if not warehouse.is_open:
-                    expected_usage = min(demand, remaining_capacity)
-                    amortized_fixed_cost = warehouse.fixed_cost / expected_usage
-                    cost += amortized_fixed_cost
-
-                if randomization > 0:
-                    variation = cost * randomization * (random.random() * 2 - 1)
-                    cost += variation
-                
-                valid_warehouses.append((wh_id, cost, remaining_capacity))
+            # Only the store's candidate warehouses, unless none of them can take goods
+            for scanned in (solution.candidate_warehouses(store_id), range(len(warehouses))):
+                for wh_id in scanned:
+                    warehouse = warehouses[wh_id]
+                    remaining_capacity = solution.get_remaining_capacity(wh_id)
+                    
+                    if remaining_capacity <= 0:
+                        continue
+                    
+                    if not solution.is_compatible(store_id, wh_id):
+                        continue
+                    
+                    # Calculate total cost (supply cost + fixed cost if not open)
+                    cost = supply_cost[store_id][wh_id]
+                    if not solution.is_open(wh_id):
+                        expected_usage = min(demand, remaining_capacity)
+                        amortized_fixed_cost = warehouse.fixed_cost / expected_usage
+                        cost += amortized_fixed_cost
+
+                    if randomization > 0:
+                        variation = cost * randomization * (random.random() * 2 - 1)
+                        cost += variation
+                    
+                    valid_warehouses.append((wh_id, cost, remaining_capacity))
+                if valid_warehouses:
+                    break
     
             valid_warehouses.sort(key=lambda x: x[1])
             
@@ -166,10 +161,107 @@ def generate_initial_solution_with_randomization(problem, randomization=0.3):
                 quantity = min(demand, capacity)
             
             solution.add_assignment(store_id, wh_id, quantity)
-            warehouse_stores[wh_id].add(store_id)
             demand -= quantity
             
             if wh_id not in assigned_warehouses:
                 assigned_warehouses.append(wh_id)
     
-    return solution
\ No newline at end of file
+    return solution
+
+def generate_initial_solution_with_heap(problem, randomization=0.0):
+    """
+    Greedy construction driven by a priority queue of (store, warehouse) pairs:
+    the cheapest pair is supplied with as much of the store's remaining demand
+    as the warehouse can take, until every store is supplied. The cost of a
+    pair is its supply cost plus, for a closed warehouse, the fixed cost spread
+    over the units it would take (as in generate_initial_solution).
+
+    Each store starts with its candidate warehouses. Keys are never lower
+    than the cost they stand for at the time they are pushed, and only grow
+    afterwards (capacity and remaining demand only shrink), so a popped pair
+    is re-checked and pushed back with its current cost if that went up, or
+    dropped if the warehouse is full or supplies an incompatible store. When
+    a warehouse opens, its pairs get cheaper, so they are pushed again for
+    the stores still waiting. A store that runs out of pairs falls back to
+    all warehouses.
+
+    - randomization: each pair's cost is scaled by a random factor in
+      [1 - randomization, 1 + randomization], drawn when the pair is pushed
+    """
+    solution = Solution(problem)
+    arrays = problem.get_arrays()
+    supply_cost = problem.get_supply_cost()
+    fixed_cost = arrays.fixed_cost.tolist()
+    room = arrays.capacity.tolist()  # Remaining capacity per warehouse
+    is_open = [False] * len(room)
+    remaining = arrays.demand.tolist()
+    num_stores = len(remaining)
+
+    def random_factors(count):
+        if randomization <= 0:
+            return [1.0] * count
+        return [1 + randomization * (random.random() * 2 - 1) for _ in range(count)]
+
+    def pair_cost(store_id, wh_id):
+        cost = supply_cost[store_id][wh_id]
+        if not is_open[wh_id]:
+            cost += fixed_cost[wh_id] / min(remaining[store_id], room[wh_id])
+        return cost
+
+    def push(store_id, wh_id):
+        if room[wh_id] <= 0 or not solution.is_compatible(store_id, wh_id):
+            return
+        factor = random_factors(1)[0]
+        heapq.heappush(heap, (pair_cost(store_id, wh_id) * factor, factor, store_id, wh_id))
+        live_pairs[store_id] += 1
+
+    # Initial pairs: every store with each of its candidate warehouses, all closed and empty
+    candidates = np.array([problem.get_candidate_warehouses(store_id) for store_id in range(num_stores)], dtype=np.int64)
+    store_column = np.repeat(np.arange(num_stores), candidates.shape[1])
+    wh_column = candidates.reshape(-1)
+    keys = (arrays.supply_cost[store_column, wh_column] +
+            arrays.fixed_cost[wh_column] / np.minimum(arrays.demand[store_column], arrays.capacity[wh_column]))
+    factors = random_factors(len(wh_column))
+    heap = list(zip((keys * factors).tolist(), factors, store_column.tolist(), wh_column.tolist()))
+    heapq.heapify(heap)
+    live_pairs = [candidates.shape[1]] * num_stores  # Heap entries per store
+    expanded = set()  # Stores whose pairs cover all warehouses
+
+    while heap:
+        key, factor, store_id, wh_id = heapq.heappop(heap)
+        live_pairs[store_id] -= 1
+        if remaining[store_id] == 0:
+            continue
+        if room[wh_id] > 0 and solution.is_compatible(store_id, wh_id):
+            cost = pair_cost(store_id, wh_id) * factor
+            if cost > key:
+                # Stale: the warehouse or the store's remaining demand shrank since the push
+                heapq.heappush(heap, (cost, factor, store_id, wh_id))
+                live_pairs[store_id] += 1
+                continue
+
+            quantity = min(remaining[store_id], room[wh_id])
+            solution.add_assignment(store_id, wh_id, quantity)
+            remaining[store_id] -= quantity
+            room[wh_id] -= quantity
+            if remaining[store_id] == 0:
+                expanded.discard(store_id)
+            if not is_open[wh_id]:
+                # Opening drops the fixed cost from the warehouse's pairs
+                is_open[wh_id] = True
+                waiting = [other_id for other_id in problem.get_candidate_stores(wh_id) if remaining[other_id] > 0]
+                waiting.extend(other_id for other_id in expanded if remaining[other_id] > 0)
+                for other_id in waiting:
+                    if other_id != store_id:
+                        push(other_id, wh_id)
+
+        if remaining[store_id] > 0 and not live_pairs[store_id]:
+            if store_id not in expanded:
+                expanded.add(store_id)
+                for other_wh_id in range(len(room)):
+                    push(store_id, other_wh_id)
+            if not live_pairs[store_id]:
+                expanded.discard(store_id)
+                print(f"Warning: Could not assign all demand for store {store_id+1} due to constraints")
+
+    return solution
@@ -0,0 +1,108 @@
+"""
+Deterministic steepest-descent polishing of a solution, driven by a queue of
+stores and warehouses whose neighbourhood may have changed.
+"""
+import time
+from collections import deque
+from solution import Move
+
+def best_shift(solution, store_id):
+    """
+    The most improving move of some of the store's units from one of its
+    warehouses to a candidate warehouse, as (delta, Move), or None if no such
+    move lowers the cost. Moving all of a warehouse's units to a single other
+    warehouse is the reassign case. The delta is computed from the cost
+    structure without touching the solution.
+    """
+    problem = solution.problem
+    supply_cost = problem.get_supply_cost()[store_id]
+    warehouses = problem.get_warehouses()
+    best = None
+    for source_wh_id, qty in solution.by_store[store_id].items():
+        # Emptying the source warehouse closes it
+        source_saving = warehouses[source_wh_id].fixed_cost if qty == solution.usage[source_wh_id] else 0
+        for wh_id in solution.candidate_warehouses(store_id):
+            if wh_id == source_wh_id:
+                continue
+            unit_change = supply_cost[wh_id] - supply_cost[source_wh_id]
+            if unit_change >= 0 and not source_saving:
+                continue
+            amount = min(qty, solution.get_remaining_capacity(wh_id))
+            if amount <= 0 or not solution.is_compatible(store_id, wh_id):
+                continue
+            delta = unit_change * amount
+            if solution.usage[wh_id] == 0:
+                delta += warehouses[wh_id].fixed_cost
+            if amount == qty:
+                delta -= source_saving
+            if delta < 0 and (best is None or delta < best[0]):
+                best = (delta, Move('shift', [(store_id, source_wh_id, -amount), (store_id, wh_id, amount)]))
+    return best
+
+def polish(solution, time_limit_seconds=None):
+    """
+    Improve `solution` in place until no single move improves it, and return
+    the change in cost (<= 0).
+
+    Stores are taken from a queue, and the most improving shift of each one
+    (see best_shift) is applied. Open warehouses are queued too, and each is
+    closed if draining its stores into the other open warehouses pays off.
+    After a change, the stores and warehouses whose options it affected are
+    queued again: the moved store, the stores that could use the capacity it
+    freed, and both warehouses.
+    """
+    problem = solution.problem
+    start_time = time.time()
+    cost_before = solution.cost()
+
+    store_queue = deque(range(len(problem.get_stores())))
+    queued_stores = set(store_queue)
+    warehouse_queue = deque(solution.get_open_warehouses())
+    queued_warehouses = set(warehouse_queue)
+
+    def mark(store_ids, wh_ids):
+        for store_id in store_ids:
+            if store_id not in queued_stores:
+                queued_stores.add(store_id)
+                store_queue.append(store_id)
+        for wh_id in wh_ids:
+            if wh_id not in queued_warehouses:
+                queued_warehouses.add(wh_id)
+                warehouse_queue.append(wh_id)
+
+    def mark_move(move):
+        touched = {wh_id for _, wh_id, _ in move.changes}
+        stores = {store_id for store_id, _, _ in move.changes}
+        for wh_id in touched:
+            stores.update(solution.by_warehouse[wh_id])
+            stores.update(problem.get_candidate_stores(wh_id))
+        mark(stores, [wh_id for wh_id in touched if solution.usage[wh_id] > 0])
+
+    while store_queue or warehouse_queue:
+        if time_limit_seconds is not None and time.time() - start_time >= time_limit_seconds:
+            break
+        if store_queue:
+            store_id = store_queue.popleft()
+            queued_stores.discard(store_id)
+            found = best_shift(solution, store_id)
+            if found is None:
+                continue
+            move = found[1]
+        else:
+            wh_id = warehouse_queue.popleft()
+            queued_warehouses.discard(wh_id)
+            if solution.usage[wh_id] == 0 or len(solution.open_set) < 2:
+                continue
+            changes = solution.drain_changes(wh_id)
+            if not changes:
+                continue
+            move = Move('close', changes)
+
+        solution.apply_move(move)
+        is_valid, _ = solution.check_move(move)
+        if not is_valid or move.delta >= 0:
+            solution.undo_move(move)
+            continue
+        mark_move(move)
+
+    return solution.cost() - cost_before
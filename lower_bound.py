@@ -0,0 +1,103 @@
+"""
+Lagrangian lower bound on the optimal cost, for reporting the optimality gap
+of a solution and stopping the search once it is small enough.
+
+The incompatibility constraints are dropped and the demand constraints
+sum_w x[s, w] = demand[s] are relaxed with multipliers lam[s]. What is left
+splits by warehouse: warehouse w is worth opening if fixed_cost[w] plus the cheapest way
+to fill its capacity with units of reduced cost supply_cost[s, w] - lam[s] < 0
+(at most demand[s] units per store) is negative. That is a continuous knapsack
+with unit weights, solved exactly by taking the stores in order of reduced
+cost. The bound is tightened with the constraint that the open capacity
+covers the total demand, which makes the choice of warehouses a knapsack
+problem, of which the linear relaxation is used. The multipliers are improved
+by subgradient optimisation.
+"""
+import math
+import time
+import numpy as np
+
+class LowerBound:
+    def __init__(self, bound, multipliers, iterations, elapsed_seconds):
+        self.bound = bound  # Valid for every feasible solution
+        self.multipliers = multipliers
+        self.iterations = iterations
+        self.elapsed_seconds = elapsed_seconds
+
+def optimality_gap(cost, bound):
+    """(cost - bound) / cost, the largest fraction by which `cost` can be above the optimum."""
+    return (cost - bound) / cost if cost > 0 else 0.0
+
+def _relaxed_value(supply_cost, demand, capacity, fixed_cost, multipliers):
+    """The Lagrangian function at `multipliers` and a subgradient of it."""
+    reduced = supply_cost - multipliers[:, None]
+    order = np.argsort(reduced, axis=0)
+    sorted_reduced = np.take_along_axis(reduced, order, axis=0)
+    sorted_demand = demand[order]
+    # Units each store gets when a warehouse is filled cheapest first, stopping at non-negative reduced costs
+    filled_before = np.cumsum(sorted_demand, axis=0) - sorted_demand
+    units = np.clip(capacity - filled_before, 0, sorted_demand) * (sorted_reduced < 0)
+    warehouse_value = fixed_cost + (sorted_reduced * units).sum(axis=0)
+
+    # Open every warehouse of negative value, then the cheapest others per unit of capacity
+    # (fractionally) until the open capacity covers the total demand
+    share = (warehouse_value < 0).astype(np.float64)
+    shortfall = demand.sum() - capacity @ share
+    if shortfall > 0:
+        rest = np.flatnonzero(warehouse_value >= 0)
+        rest = rest[np.argsort(warehouse_value[rest] / capacity[rest], kind='stable')]
+        covered_before = np.cumsum(capacity[rest]) - capacity[rest]
+        share[rest] = np.clip((shortfall - covered_before) / capacity[rest], 0, 1)
+
+    supplied = np.zeros_like(reduced)
+    np.put_along_axis(supplied, order, units, axis=0)
+    subgradient = demand - supplied @ share
+    return multipliers @ demand + warehouse_value @ share, subgradient
+
+def lagrangian_bound(problem, upper_bound, max_iterations=300, time_limit_seconds=None, multipliers=None,
+                     step_scale=2.0, patience=20, min_step_scale=1e-3):
+    """
+    Lower bound on the optimal cost of `problem` by subgradient optimisation.
+
+    upper_bound (the cost of any feasible solution) sets the step size:
+    step_scale * (upper_bound - value) / |subgradient|^2. step_scale is halved
+    after `patience` iterations without improvement, and the search stops when
+    it falls below min_step_scale, after max_iterations, or at the time limit.
+    multipliers continues from a previous LowerBound.multipliers. The bound
+    is rounded up, since every cost is an integer.
+    """
+    start_time = time.time()
+    arrays = problem.get_arrays()
+    supply_cost = arrays.supply_cost.astype(np.float64)
+    demand = arrays.demand.astype(np.float64)
+    capacity = arrays.capacity.astype(np.float64)
+    fixed_cost = arrays.fixed_cost.astype(np.float64)
+    if multipliers is None:
+        # Each store's cheapest supply cost plus the lowest fixed cost per unit of capacity
+        multipliers = supply_cost.min(axis=1) + (fixed_cost / capacity).min()
+    multipliers = np.array(multipliers, dtype=np.float64)
+
+    best_value, best_multipliers = -math.inf, multipliers.copy()
+    stalled = 0
+    iteration = 0
+    while iteration < max_iterations and step_scale >= min_step_scale:
+        if time_limit_seconds is not None and time.time() - start_time >= time_limit_seconds:
+            break
+        iteration += 1
+        value, subgradient = _relaxed_value(supply_cost, demand, capacity, fixed_cost, multipliers)
+        if value > best_value + 1e-9:
+            best_value, best_multipliers = value, multipliers.copy()
+            stalled = 0
+        else:
+            stalled += 1
+            if stalled >= patience:
+                step_scale /= 2
+                stalled = 0
+        norm = subgradient @ subgradient
+        if norm == 0:
+            break  # The relaxed solution satisfies every demand, so the bound is exact for the relaxation
+        multipliers = multipliers + step_scale * max(upper_bound - value, 0) / norm * subgradient
+
+    # A small tolerance so floating-point error never rounds a bound up past an integer optimum
+    bound = math.ceil(best_value - 1e-6) if best_value > -math.inf else 0
+    return LowerBound(max(bound, 0), best_multipliers, iteration, time.time() - start_time)
@@ -1,106 +1,220 @@
-import os
+"""
+Solve one or more instances and save each solution under
+tmp/solution/<instance>/<timestamp>/ (solution.txt and output.txt).
+
+Examples:
+    python main.py PublicInstances/wlp02.dzn
+    python main.py "PublicInstances/wlp0*.dzn" --minutes 5 --seed 1 --jobs 4
+
+With --jobs above 1, several instances are solved at once in a process pool
+and only a summary line per instance is printed while they run.
+"""
+import argparse
 import datetime
+import glob
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from parser import parse_file
 from validator import validate_solution
 from simulated_annealing import simulated_annealing
-
-if __name__ == "__main__":
-    try:
-        # Hardcoded instance path
-        file_path = "./PublicInstances/wlp02.dzn"
-
-        print(f"Parsing file: {file_path}")
-        problem = parse_file(file_path)
-        print("File parsed successfully.")
-
-        # Run Simulated Annealing
-        print("Running Simulated Annealing...")
-        initial_solution = simulated_annealing(problem)
-
-        # Validate the solution
-        is_valid, message = validate_solution(problem, initial_solution)
-
-        # Prepare output paths
-        base_filename = os.path.basename(file_path).split('.')[0]
-        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-        solution_dir = f"tmp/solution/{base_filename}/{timestamp}"
-        os.makedirs(solution_dir, exist_ok=True)
-
-        solution_file = f"{solution_dir}/solution.txt"
-        output_file = f"{solution_dir}/output.txt"
-
-        # Write solution file (triples format)
-        with open(solution_file, 'w') as f:
-            triples = initial_solution.to_triples_format()
-            f.write(f"{{{', '.join([str(t) for t in triples])}}}")
-
-        # Write detailed log file
-        with open(output_file, 'w') as f:
-            def write_output(text):
-                print(text)
-                f.write(text + "\n")
-
-            write_output(f"Warehouses: {len(problem.get_warehouses())}")
-            write_output(f"Stores: {len(problem.get_stores())}")
-            write_output(f"Incompatibilities: {len(problem.get_incompatibilities())}")
-
-            write_output("\nWarehouse capacities:")
-            for w in problem.get_warehouses():
-                write_output(f"Warehouse {w.id + 1}: Capacity={w.capacity}, Fixed Cost={w.fixed_cost}")
-
-            write_output("\nStore demands:")
-            for s in problem.get_stores():
-                write_output(f"Store {s.id + 1}: Demand={s.demand}")
-
-            write_output("\nSupply costs:")
-            for i, row in enumerate(problem.get_supply_cost()):
-                write_output(f"Store {i + 1}: {row}")
-
-            write_output("\nIncompatibilities:")
-            for pair in problem.get_incompatibilities():
-                write_output(f"Store {pair[0] + 1} and Store {pair[1] + 1}")
-
-            write_output("\nStore incompatibilities (from store objects):")
-            for s in problem.get_stores():
-                if s.incompatible_stores:
-                    incomp_list = [str(store_id + 1) for store_id in s.incompatible_stores]
-                    write_output(f"Store {s.id + 1} is incompatible with: {', '.join(incomp_list)}")
-
-            # Add solution summary
-            write_output("\n--- SIMULATED ANNEALING SOLUTION ---")
-            write_output(f"Solution valid: {is_valid}")
-            write_output(f"Validation message: {message}")
-
-            total_cost, supply_cost, opening_cost = initial_solution.get_total_cost()
-            write_output(f"Total cost: {total_cost} = {supply_cost} (supply cost) + {opening_cost} (opening cost)")
-
-            write_output("\nSolution in triples format:")
-            triples = initial_solution.to_triples_format()
-            write_output(f"{{{', '.join([str(t) for t in triples])}}}")
-
-            write_output("\nStore assignments:")
-            store_assignments = initial_solution.get_store_assignments()
-            for store_id in range(len(problem.get_stores())):
-                assignments = store_assignments.get(store_id, [])
-                if assignments:
-                    for wh_id, qty in assignments:
-                        write_output(f"Store {store_id + 1} → Warehouse {wh_id + 1}: {qty}")
+from multistart import multi_start_annealing
+from solution import load_solution
+from grasp import grasp
+from report import REPORT_LEVELS, SOLUTION_FORMATS, write_report, write_solution
+
+DEFAULT_INSTANCE = "./PublicInstances/wlp02.dzn"
+GRASP_TIME_SHARE = 0.1  # Largest share of the time budget the GRASP stage may use
+
+def new_solution_dir(output_root, base_filename):
+    """
+    Create and return <output_root>/<instance>/<timestamp>, with a -2, -3, ...
+    suffix if another run already saved there within the same second.
+    """
+    solution_dir = f"{output_root}/{base_filename}/{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    os.makedirs(os.path.dirname(solution_dir), exist_ok=True)
+    candidate, suffix = solution_dir, 1
+    while True:
+        try:
+            os.mkdir(candidate)
+            return candidate
+        except FileExistsError:
+            suffix += 1
+            candidate = f"{solution_dir}-{suffix}"
+
+def solve_instance(file_path, time_limit_minutes=15, seed=None, num_workers=1, warm_start_dir=None,
+                   checkpoint_dir=None, output_root="tmp/solution", verbose=True, report_level='full',
+                   echo_level='summary', solution_format='text', grasp_constructions=0, target_gap=None,
+                   max_iterations=None):
+    """
+    Parse, solve, validate and save one instance. Returns a summary dict
+    with the instance name, costs, validity, wall time and output directory.
+    output.txt holds the report at report_level, and the report at echo_level
+    is printed when verbose. With a solution_format other than text, the
+    solution is also saved as solution.json or solution.npz. With
+    grasp_constructions, the annealers start from a GRASP elite pool (see
+    grasp.py) built within GRASP_TIME_SHARE of the time budget. target_gap
+    stops the annealers once their optimality gap to a Lagrangian lower bound
+    (see lower_bound.py) is at most that fraction. max_iterations caps each
+    annealer's iterations; with None they run for the whole time budget.
+
+    Without a seed, multi-start and GRASP use a random base seed, which is
+    logged so the run can be repeated.
+    """
+    start_time = time.time()
+    base_filename = os.path.basename(file_path).split('.')[0]
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    log(f"Parsing file: {file_path}")
+    problem = parse_file(file_path, use_cache=True)
+    log("File parsed successfully.")
+
+    warm_start = None
+    if warm_start_dir and num_workers == 1:
+        warm_start_file = os.path.join(warm_start_dir, base_filename, "solution.txt")
+        if os.path.exists(warm_start_file):
+            try:
+                warm_start = load_solution(problem, warm_start_file)
+            except ValueError as e:
+                log(f"Warning: ignoring warm start: {e}")
+            if warm_start is not None:
+                is_valid, message = validate_solution(problem, warm_start)
+                if is_valid:
+                    log(f"Warm start from: {warm_start_file}")
                 else:
-                    write_output(f"Store {store_id + 1} → Not assigned")
+                    log(f"Warning: ignoring warm start {warm_start_file}: {message}")
+                    warm_start = None
+
+    base_seed = seed
+    if base_seed is None and (num_workers > 1 or grasp_constructions):
+        base_seed = random.randrange(2 ** 31)
+        log(f"Base seed: {base_seed}")
+
+    elite = []
+    if grasp_constructions and warm_start is None:
+        log(f"Running GRASP ({grasp_constructions} constructions)...")
+        grasp_start = time.time()
+        elite = grasp(problem, grasp_constructions, base_seed=base_seed,
+                      time_limit_seconds=time_limit_minutes * 60 * GRASP_TIME_SHARE, verbose=verbose).members
+        time_limit_minutes -= (time.time() - grasp_start) / 60
+
+    # Run Simulated Annealing
+    if num_workers > 1:
+        log(f"Running Simulated Annealing on {num_workers} workers...")
+        solution = multi_start_annealing(problem, num_workers=num_workers, base_seed=base_seed,
+                                         time_limit_minutes=time_limit_minutes, verbose=verbose,
+                                         initial_solutions=elite or None, target_gap=target_gap,
+                                         max_iterations=max_iterations)
+    else:
+        log("Running Simulated Annealing...")
+        if elite:
+            warm_start = elite[0]
+        checkpoint_file = os.path.join(checkpoint_dir, f"{base_filename}.npz") if checkpoint_dir else None
+        solution = simulated_annealing(problem, time_limit_minutes=time_limit_minutes, seed=seed, verbose=verbose,
+                                       initial_solution=warm_start, checkpoint_path=checkpoint_file, resume=True,
+                                       target_gap=target_gap, max_iterations=max_iterations)
+
+    # Validate the solution
+    is_valid, message = validate_solution(problem, solution)
+
+    # Prepare output paths
+    solution_dir = new_solution_dir(output_root, base_filename)
+    solution_file = f"{solution_dir}/solution.txt"
+    output_file = f"{solution_dir}/output.txt"
+
+    write_solution(solution, solution_file)
+    if solution_format != 'text':
+        write_solution(solution, f"{solution_dir}/solution.{SOLUTION_FORMATS[solution_format]}", solution_format)
+    write_report(problem, solution, is_valid, message, output_file, level=report_level,
+                 echo_level=echo_level if verbose else None)
+    log(f"\nOutput saved to: {output_file}")
+    log(f"Solution saved to: {solution_file}")
+
+    total_cost, supply_cost, opening_cost = solution.get_total_cost()
+    return {
+        'instance': base_filename,
+        'cost': total_cost,
+        'supply_cost': supply_cost,
+        'opening_cost': opening_cost,
+        'valid': is_valid,
+        'message': message,
+        'seconds': time.time() - start_time,
+        'solution_dir': solution_dir,
+    }
+
+def format_summary(results):
+    lines = [f"{'Instance':<12} {'Cost':>10} {'Supply':>10} {'Opening':>10} {'Valid':<6} {'Time':>8}  Output"]
+    for result in results:
+        if 'error' in result:
+            lines.append(f"{result['instance']:<12} {'-':>10} {'-':>10} {'-':>10} {'-':<6} {'-':>8}  Error: {result['error']}")
+            continue
+        lines.append(f"{result['instance']:<12} {result['cost']:>10} {result['supply_cost']:>10} {result['opening_cost']:>10} "
+                     f"{str(result['valid']):<6} {result['seconds']:>7.1f}s  {result['solution_dir']}")
+    return "\n".join(lines)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('instances', nargs='*', default=[DEFAULT_INSTANCE], help='instance paths or globs')
+    arg_parser.add_argument('--minutes', type=float, default=15, help='time budget per instance')
+    arg_parser.add_argument('--seed', type=int, default=None, help='random seed (one per instance run)')
+    arg_parser.add_argument('--max-iterations', type=int, default=None,
+                            help='iteration limit per annealer (default: none, run for --minutes)')
+    arg_parser.add_argument('--jobs', type=int, default=1, help='instances solved at the same time')
+    arg_parser.add_argument('--workers', type=int, default=1, help='independent annealers per instance (multi-start)')
+    arg_parser.add_argument('--warm-start-dir', default=None,
+                            help='start from <dir>/<instance>/solution.txt where it exists, e.g. solutions (single annealer only)')
+    arg_parser.add_argument('--checkpoint-dir', default=None,
+                            help='checkpoint each run to <dir>/<instance>.npz and resume an unfinished run from it (single annealer only)')
+    arg_parser.add_argument('--output-dir', default='tmp/solution')
+    arg_parser.add_argument('--report', choices=REPORT_LEVELS, default='full', help='detail of output.txt')
+    arg_parser.add_argument('--echo', choices=REPORT_LEVELS + ('none',), default='summary',
+                            help='detail of the report printed after each run')
+    arg_parser.add_argument('--grasp', type=int, default=0, metavar='N',
+                            help='start the annealers from the elite pool of N parallel GRASP constructions')
+    arg_parser.add_argument('--target-gap', type=float, default=None, metavar='PERCENT',
+                            help='stop once the cost is within PERCENT of a Lagrangian lower bound')
+    arg_parser.add_argument('--solution-format', choices=tuple(SOLUTION_FORMATS), default='text',
+                            help='also save the solution as solution.json or solution.npz')
+    args = arg_parser.parse_args()
+
+    instance_paths = sorted({path for pattern in args.instances for path in glob.glob(pattern)})
+    if not instance_paths:
+        arg_parser.error(f"No instances match {args.instances}")
+
+    options = dict(time_limit_minutes=args.minutes, seed=args.seed, num_workers=args.workers,
+                   warm_start_dir=args.warm_start_dir, checkpoint_dir=args.checkpoint_dir, output_root=args.output_dir,
+                   report_level=args.report, echo_level=None if args.echo == 'none' else args.echo,
+                   solution_format=args.solution_format, grasp_constructions=args.grasp,
+                   target_gap=None if args.target_gap is None else args.target_gap / 100,
+                   max_iterations=args.max_iterations)
+    results = []
+    if args.jobs <= 1:
+        for path in instance_paths:
+            try:
+                results.append(solve_instance(path, verbose=True, **options))
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                results.append({'instance': os.path.basename(path).split('.')[0], 'error': str(e)})
+    else:
+        print(f"Solving {len(instance_paths)} instances, {args.jobs} at a time, {args.minutes} minutes each")
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {pool.submit(solve_instance, path, verbose=False, **options): path for path in instance_paths}
+            for future in as_completed(futures):
+                name = os.path.basename(futures[future]).split('.')[0]
+                try:
+                    result = future.result()
+                    print(f"{name}: cost {result['cost']} (valid: {result['valid']}) in {result['seconds']:.1f}s")
+                except Exception as e:
+                    result = {'instance': name, 'error': str(e)}
+                    print(f"{name}: Error: {str(e)}")
+                results.append(result)
+
+    results.sort(key=lambda result: result['instance'])
+    print("\nSummary:")
+    print(format_summary(results))
 
-            write_output("\nWarehouse usage:")
-            for wh in problem.get_warehouses():
-                if wh.current_usage > 0:
-                    write_output(f"Warehouse {wh.id + 1}: {wh.current_usage}/{wh.capacity} ({wh.current_usage/wh.capacity*100:.1f}%)")
-
-            write_output("\nOpen warehouses:")
-            open_wh = [wh.id + 1 for wh in problem.get_warehouses() if wh.is_open]
-            write_output(f"{open_wh}")
-
-        print(f"\nOutput saved to: {output_file}")
-        print(f"Solution saved to: {solution_file}")
-
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,10 @@
+import numpy as np
+
 class Warehouse:
     def __init__(self, id, capacity, fixed_cost):
         self.id = id
         self.capacity = capacity
         self.fixed_cost = fixed_cost
-        self.is_open = False
-        self.current_usage = 0
-    
-    def open(self):
-        self.is_open = True
-    
-    def add_usage(self, quantity):
-        self.current_usage += quantity
-        if self.current_usage > 0:
-            self.is_open = True
-    
-    def get_remaining_capacity(self):
-        return self.capacity - self.current_usage
 
 class Store:
     def __init__(self, id, demand):
@@ -30,12 +19,77 @@ class Store:
     def is_incompatible_with(self, store_id):
         return store_id in self.incompatible_stores
 
+def build_incompatibility_csr(num_stores, incompatibilities):
+    """
+    Build a symmetric CSR adjacency (indptr, indices) over stores from a list of
+    0-based incompatible pairs. The neighbours of store s are
+    indices[indptr[s]:indptr[s + 1]], sorted and without duplicates.
+    """
+    pairs = np.asarray(incompatibilities, dtype=np.int32).reshape(-1, 2)
+    source = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    target = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    keys = np.unique(source.astype(np.int64) * num_stores + target)
+    source = (keys // num_stores).astype(np.int32)
+    indices = (keys % num_stores).astype(np.int32)
+    indptr = np.zeros(num_stores + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=num_stores), out=indptr[1:])
+    return indptr, indices
+
+class ProblemArrays:
+    """
+    Compact array view of an instance: capacity, fixed cost and demand vectors,
+    the SupplyCost matrix (stores x warehouses, int32) and the incompatibility
+    graph in CSR form.
+    """
+    def __init__(self, capacity, fixed_cost, demand, supply_cost, incompat_indptr, incompat_indices):
+        self.capacity = np.asarray(capacity, dtype=np.int64)
+        self.fixed_cost = np.asarray(fixed_cost, dtype=np.int64)
+        self.demand = np.asarray(demand, dtype=np.int64)
+        self.supply_cost = np.asarray(supply_cost, dtype=np.int32)
+        self.incompat_indptr = np.asarray(incompat_indptr, dtype=np.int64)
+        self.incompat_indices = np.asarray(incompat_indices, dtype=np.int32)
+        for array in (self.capacity, self.fixed_cost, self.demand, self.supply_cost,
+                      self.incompat_indptr, self.incompat_indices):
+            array.flags.writeable = False
+
+    @property
+    def num_warehouses(self):
+        return len(self.capacity)
+
+    @property
+    def num_stores(self):
+        return len(self.demand)
+
+    def incompatible_with(self, store_id):
+        return self.incompat_indices[self.incompat_indptr[store_id]:self.incompat_indptr[store_id + 1]]
+
+# Default length of each store's candidate warehouse list (see set_candidate_count)
+DEFAULT_CANDIDATE_COUNT = 10
+# Length of the longer list that moves fall back to when the candidates cannot take a store
+FALLBACK_CANDIDATE_COUNT = 50
+# Most open warehouses added to a candidate list with include_open (see set_candidate_count)
+OPEN_CANDIDATE_COUNT = 10
+
 class WarehouseLocationProblem:
-    def __init__(self, warehouses, stores, supply_cost, incompatibilities):
+    def __init__(self, warehouses, stores, supply_cost, incompatibilities, arrays=None):
         self.warehouses = warehouses
         self.stores = stores
         self.supply_cost = supply_cost
         self.incompatibilities = incompatibilities
+        if arrays is None:
+            arrays = ProblemArrays(
+                [w.capacity for w in warehouses],
+                [w.fixed_cost for w in warehouses],
+                [s.demand for s in stores],
+                np.asarray(supply_cost, dtype=np.int32).reshape(len(stores), len(warehouses)),
+                *build_incompatibility_csr(len(stores), incompatibilities)
+            )
+        self.arrays = arrays
+        self.candidate_count = DEFAULT_CANDIDATE_COUNT
+        self.candidates_include_open = False
+        self.candidates = None  # Built on first use
+        self.candidate_stores = None
+        self.fallback_candidates = None
         
         for pair in incompatibilities:
             store1_id, store2_id = pair
@@ -52,4 +106,59 @@ class WarehouseLocationProblem:
         return self.supply_cost
 
     def get_incompatibilities(self):
-        return self.incompatibilities 
\ No newline at end of file
+        return self.incompatibilities
+
+    def get_arrays(self):
+        return self.arrays
+
+    def set_candidate_count(self, k, include_open=False):
+        """
+        Restrict the warehouses that moves and the constructors consider for a
+        store to its k cheapest by supply cost (None for all warehouses). With
+        include_open=True, a random sample of at most OPEN_CANDIDATE_COUNT of the
+        warehouses open in the current solution is considered as well, drawn
+        again for every move.
+
+        This changes the problem, and so every solver and worker process that
+        shares it: set it before starting them, and use a separate problem
+        (e.g. another parse_file) for runs with a different setting.
+        """
+        self.candidate_count = k
+        self.candidates_include_open = include_open
+        self.candidates = None
+        self.candidate_stores = None
+        self.fallback_candidates = None
+
+    def _cheapest_warehouses(self, k):
+        """Each store's k cheapest warehouses (all for k=None), cheapest supply cost first, as lists."""
+        supply_cost = self.arrays.supply_cost
+        if k is None or k >= supply_cost.shape[1]:
+            return np.argsort(supply_cost, axis=1, kind='stable').tolist()
+        nearest = np.argpartition(supply_cost, k - 1, axis=1)[:, :k]
+        costs = np.take_along_axis(supply_cost, nearest, axis=1)
+        return np.take_along_axis(nearest, np.argsort(costs, axis=1, kind='stable'), axis=1).tolist()
+
+    def get_candidate_warehouses(self, store_id):
+        """The store's candidate warehouses, cheapest supply cost first."""
+        if self.candidates is None:
+            self.candidates = self._cheapest_warehouses(self.candidate_count)
+        return self.candidates[store_id]
+
+    def get_fallback_warehouses(self, store_id):
+        """
+        The store's FALLBACK_CANDIDATE_COUNT cheapest warehouses (at least its
+        candidates), cheapest supply cost first.
+        """
+        if self.fallback_candidates is None:
+            k = self.candidate_count
+            self.fallback_candidates = self._cheapest_warehouses(None if k is None else max(k, FALLBACK_CANDIDATE_COUNT))
+        return self.fallback_candidates[store_id]
+
+    def get_candidate_stores(self, warehouse_id):
+        """The stores that have the warehouse in their candidate list."""
+        if self.candidate_stores is None:
+            self.candidate_stores = [[] for _ in self.warehouses]
+            for store_id in range(len(self.stores)):
+                for wh_id in self.get_candidate_warehouses(store_id):
+                    self.candidate_stores[wh_id].append(store_id)
+        return self.candidate_stores[warehouse_id]
@@ -0,0 +1,106 @@
+import math
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from simulated_annealing import simulated_annealing, new_stats, initial_lower_bound
+from workers import init_worker, worker_problem, worker_progress, rebuild_solution
+
+def _run_annealer(worker_id, seed, sa_params, start_assignments=None):
+    def report(iteration, elapsed_seconds, cost):
+        worker_progress().put((worker_id, iteration, elapsed_seconds, cost))
+
+    if start_assignments is not None:
+        sa_params = dict(sa_params, initial_solution=rebuild_solution(start_assignments))
+    stats = new_stats()
+    best = simulated_annealing(worker_problem(), seed=seed, verbose=False, on_improvement=report, stats=stats, **sa_params)
+    return worker_id, seed, best.cost(), best.assignments, stats
+
+def multi_start_annealing(problem, num_workers=None, seeds=None, base_seed=0, time_limit_minutes=15,
+                          report_interval_seconds=10, verbose=True, on_improvement=None, stats=None,
+                          initial_solutions=None, bound_time_share=0.05, **sa_params):
+    """
+    Run independent simulated annealing runs with distinct seeds in a process
+    pool and return the overall best solution.
+
+    Every worker receives the problem once, at start-up, and runs
+    simulated_annealing(**sa_params). The whole search takes the wall-clock
+    budget time_limit_minutes: with one seed per worker every run gets all of
+    it, and with more seeds than workers the runs are queued in waves that
+    share it equally. Workers report improvements through a queue, and the
+    global best is printed every `report_interval_seconds`.
+
+    on_improvement(None, elapsed_seconds, cost) is called when the global best
+    improves, and a stats dict receives the counters summed over all runs.
+    With initial_solutions (e.g. the members of a grasp.ElitePool), run i
+    starts from initial_solutions[i % len(initial_solutions)] instead of its
+    own construction.
+
+    With a target_gap in sa_params and no lower_bound, the Lagrangian bound
+    is computed once here, within bound_time_share of the time limit, and
+    passed to every run.
+    """
+    if num_workers is not None and num_workers < 1:
+        raise ValueError(f"num_workers must be at least 1, got {num_workers}")
+    if seeds is not None and not seeds:
+        raise ValueError("seeds must not be empty")
+    if initial_solutions is not None and not initial_solutions:
+        raise ValueError("initial_solutions must not be empty (pass None to construct the starts)")
+    if seeds is None:
+        num_workers = num_workers or os.cpu_count() or 1
+        seeds = [base_seed + i for i in range(num_workers)]
+    num_workers = min(num_workers or len(seeds), len(seeds))
+
+    start_time = time.time()
+    if sa_params.get('target_gap') is not None and sa_params.get('lower_bound') is None:
+        upper_bound = min(solution.cost() for solution in initial_solutions) if initial_solutions else None
+        sa_params['lower_bound'] = initial_lower_bound(problem, time_limit_minutes * 60 * bound_time_share, upper_bound)
+        if verbose:
+            print(f"Lower bound: {sa_params['lower_bound']}")
+        time_limit_minutes -= (time.time() - start_time) / 60
+    sa_params = dict(sa_params, time_limit_minutes=time_limit_minutes / math.ceil(len(seeds) / num_workers))
+
+    if stats is not None:
+        stats.update(new_stats())
+    global_best = None
+    best_result = None
+    last_report = start_time
+
+    with multiprocessing.Manager() as manager:
+        progress = manager.Queue()
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker, initargs=(problem, progress)) as pool:
+            starts = [solution.assignments for solution in initial_solutions or []]
+            pending = {pool.submit(_run_annealer, worker_id, seed, sa_params,
+                                   starts[worker_id % len(starts)] if starts else None)
+                       for worker_id, seed in enumerate(seeds)}
+            while pending:
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                while True:
+                    try:
+                        worker_id, iteration, elapsed, cost = progress.get_nowait()
+                    except queue.Empty:
+                        break
+                    if global_best is None or cost < global_best:
+                        global_best = cost
+                        if on_improvement is not None:
+                            on_improvement(None, time.time() - start_time, cost)
+                for future in done:
+                    worker_id, seed, cost, assignments, worker_stats = future.result()
+                    if stats is not None:
+                        for key in ('iterations', 'moves_evaluated', 'moves_accepted'):
+                            stats[key] += worker_stats[key]
+                    if verbose:
+                        print(f"Worker {worker_id} (seed {seed}) finished with cost {cost}")
+                    if best_result is None or cost < best_result[0]:
+                        best_result = (cost, assignments)
+                if verbose and time.time() - last_report >= report_interval_seconds:
+                    last_report = time.time()
+                    print(f"{(last_report - start_time) / 60:.1f} min: global best cost {global_best}, {len(pending)} workers running")
+
+    if stats is not None:
+        stats['elapsed_seconds'] = time.time() - start_time
+    best_solution = rebuild_solution(best_result[1], problem)
+    if verbose:
+        print(f"Multi-start annealing finished: best cost {best_solution.cost()} over {len(seeds)} runs")
+    return best_solution
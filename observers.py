@@ -0,0 +1,185 @@
+import json
+import time
+
+# Outcomes reported to AnnealingObserver.on_move
+EMPTY = 'empty'  # The neighbourhood had nothing to change
+INFEASIBLE = 'infeasible'
+REJECTED = 'rejected'
+ACCEPTED = 'accepted'  # Accepted without lowering the cost
+IMPROVING = 'improving'  # Accepted and lowered the cost
+
+class AnnealingObserver:
+    """
+    Base class for annealing observers; every hook is a no-op, so subclasses
+    only override what they need. on_move is only dispatched to observers that
+    override it, so observers that ignore single moves add no per-move cost.
+    """
+    def on_start(self, solution, elapsed_seconds, params):
+        pass
+
+    def on_move(self, kind, outcome, delta, seconds):
+        pass
+
+    def on_progress(self, iteration, elapsed_seconds, T, current_cost, best_cost):
+        pass
+
+    def on_temperature(self, iteration, old_T, new_T, reason, iterations_at_temperature):
+        pass
+
+    def on_improvement(self, iteration, elapsed_seconds, cost):
+        pass
+
+    def on_finish(self, iteration, elapsed_seconds, best_solution, reason, is_valid, message):
+        pass
+
+def observes_moves(observer):
+    return getattr(observer.on_move, '__func__', None) is not AnnealingObserver.on_move
+
+class ConsoleObserver(AnnealingObserver):
+    """Human-readable progress on stdout (what simulated_annealing prints with verbose=True)."""
+    def __init__(self, print_fn=print):
+        self.print = print_fn
+        self.records = []
+        self.initial_cost = None
+
+    def on_start(self, solution, elapsed_seconds, params):
+        self.initial_cost, supply_cost, opening_cost = solution.get_total_cost()
+        self.records = [(0, self.initial_cost)]
+        self.print(f"Initial solution cost: {self.initial_cost} = {supply_cost} (supply cost) + {opening_cost} (opening cost)")
+        max_iterations = 'no limit' if params['max_iterations'] is None else params['max_iterations']
+        self.print(f"Starting simulated annealing with max iterations: {max_iterations}")
+        self.print(f"Annealing parameters: T_initial={params['T_initial']}, T_min={params['T_min']}, "
+                   f"alpha={params['alpha']}, inner_limit={params['inner_limit']}")
+        self.print(f"Time limit: {params['time_limit_minutes']} minutes")
+        self.print(f"Initial temperature: {params['T_initial']:.2f}")
+
+    def on_progress(self, iteration, elapsed_seconds, T, current_cost, best_cost):
+        self.records.append((iteration, best_cost))
+        self.print(f"Iteration {iteration} ({elapsed_seconds / 60:.1f} min): Current temperature: {T:.2f}, Best cost: {best_cost}")
+
+    def on_temperature(self, iteration, old_T, new_T, reason, iterations_at_temperature):
+        if reason == 'reset':
+            self.print(f"Temperature reached minimum ({old_T:.2f}), resetting to {new_T}")
+        elif reason == 'accelerated':
+            self.print(f"No improvement at temperature {old_T:.2f}, accelerating to {new_T:.2f}")
+        else:
+            self.print(f"Temperature decreased: {old_T:.2f} -> {new_T:.2f} (after {iterations_at_temperature} iterations at this temperature)")
+
+    def on_improvement(self, iteration, elapsed_seconds, cost):
+        self.print(f"Iteration {iteration} ({elapsed_seconds / 60:.1f} min): Found better solution with cost {cost}")
+
+    def on_finish(self, iteration, elapsed_seconds, best_solution, reason, is_valid, message):
+        self.print(f"\nSimulated annealing completed after {iteration} iterations ({elapsed_seconds / 60:.2f} minutes)")
+        if reason == 'time_limit':
+            self.print("Terminated due to reaching the time limit")
+        elif reason == 'target_gap':
+            self.print("Stopped early: the optimality gap reached the target")
+        else:
+            self.print("Completed due to reaching maximum iterations limit")
+
+        final_cost, final_supply_cost, final_opening_cost = best_solution.get_total_cost()
+        self.print(f"Final solution cost: {final_cost} = {final_supply_cost} (supply cost) + {final_opening_cost} (opening cost)")
+        if final_cost < self.initial_cost:
+            improvement = self.initial_cost - final_cost
+            self.print(f"Improvement: {improvement} ({improvement / self.initial_cost * 100:.2f}%)")
+        else:
+            self.print("No improvement from initial solution")
+
+        self.print("\nImprovement over iterations:")
+        for iter_num, cost in self.records:
+            self.print(f"At iteration {iter_num}: Cost = {cost}")
+
+        if not is_valid:
+            self.print(f"Error: Final solution is invalid: {message}")
+        else:
+            self.print("Final solution is valid.")
+
+class CallbackObserver(AnnealingObserver):
+    """Adapts a plain callback(iteration, elapsed_seconds, cost) to the starting solution and each new best."""
+    def __init__(self, callback):
+        self.callback = callback
+
+    def on_start(self, solution, elapsed_seconds, params):
+        self.callback(0, elapsed_seconds, solution.cost())
+
+    def on_improvement(self, iteration, elapsed_seconds, cost):
+        self.callback(iteration, elapsed_seconds, cost)
+
+class MoveStatsObserver(AnnealingObserver):
+    """
+    Per-neighbourhood counters (proposed, empty, infeasible, rejected, accepted,
+    improving) and wall time, plus the temperature trace and incumbent history.
+    """
+    def __init__(self):
+        self.moves = {}
+        self.temperature_trace = []
+        self.incumbent_history = []
+
+    def on_start(self, solution, elapsed_seconds, params):
+        self.temperature_trace.append((0, params['T_initial']))
+        self.incumbent_history.append((0, elapsed_seconds, solution.cost()))
+
+    def on_move(self, kind, outcome, delta, seconds):
+        counters = self.moves.get(kind)
+        if counters is None:
+            counters = self.moves[kind] = {
+                'proposed': 0, EMPTY: 0, INFEASIBLE: 0, REJECTED: 0, ACCEPTED: 0, IMPROVING: 0, 'seconds': 0.0
+            }
+        counters['proposed'] += 1
+        counters[outcome] += 1
+        counters['seconds'] += seconds
+
+    def on_temperature(self, iteration, old_T, new_T, reason, iterations_at_temperature):
+        self.temperature_trace.append((iteration, new_T))
+
+    def on_improvement(self, iteration, elapsed_seconds, cost):
+        self.incumbent_history.append((iteration, elapsed_seconds, cost))
+
+    def summary(self):
+        return {
+            'moves': self.moves,
+            'temperature_trace': self.temperature_trace,
+            'incumbent_history': self.incumbent_history,
+        }
+
+class JsonLinesObserver(AnnealingObserver):
+    """
+    Structured log: one JSON object per event. Single moves are not logged;
+    with include_move_stats=True the per-neighbourhood counters are written
+    with the final event.
+    """
+    def __init__(self, file, include_move_stats=True):
+        self.file = open(file, 'a') if isinstance(file, str) else file
+        self.owns_file = isinstance(file, str)
+        self.move_stats = MoveStatsObserver() if include_move_stats else None
+        if self.move_stats is not None:
+            self.on_move = self.move_stats.on_move
+
+    def _write(self, event, **fields):
+        fields['event'] = event
+        fields['time'] = time.time()
+        self.file.write(json.dumps(fields) + "\n")
+
+    def on_start(self, solution, elapsed_seconds, params):
+        self._write('start', elapsed_seconds=elapsed_seconds, cost=solution.cost(), params=params)
+
+    def on_progress(self, iteration, elapsed_seconds, T, current_cost, best_cost):
+        self._write('progress', iteration=iteration, elapsed_seconds=elapsed_seconds, T=T,
+                    current_cost=current_cost, best_cost=best_cost)
+
+    def on_temperature(self, iteration, old_T, new_T, reason, iterations_at_temperature):
+        self._write('temperature', iteration=iteration, old_T=old_T, new_T=new_T, reason=reason)
+
+    def on_improvement(self, iteration, elapsed_seconds, cost):
+        self._write('improvement', iteration=iteration, elapsed_seconds=elapsed_seconds, cost=cost)
+
+    def on_finish(self, iteration, elapsed_seconds, best_solution, reason, is_valid, message):
+        fields = dict(iteration=iteration, elapsed_seconds=elapsed_seconds, cost=best_solution.cost(),
+                      reason=reason, valid=is_valid, message=message)
+        if self.move_stats is not None:
+            fields['moves'] = self.move_stats.moves
+        self._write('finish', **fields)
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
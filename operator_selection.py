@@ -0,0 +1,73 @@
+import random
+from solution import MOVE_KINDS
+from observers import ACCEPTED, IMPROVING
+
+class AdaptiveOperatorSelector:
+    """
+    Roulette-wheel choice of the neighbourhood for the next move, with weights
+    learned online from the moves' outcomes.
+
+    Each kind keeps a recency-weighted average of its rewards: improve_reward
+    for a move that lowered the cost, accept_reward for any other accepted
+    move, and 0 for moves that were empty, infeasible or rejected. Selection
+    probabilities are proportional to these qualities, but never drop below
+    min_probability, so a neighbourhood that is useless now (merge, when no
+    store is split) is still tried often enough to notice when it becomes
+    useful again. Probabilities are recomputed every `update_interval` moves.
+
+    Uses the random module, so seeded runs stay reproducible.
+    """
+    def __init__(self, kinds=MOVE_KINDS, accept_reward=1.0, improve_reward=5.0, decay=0.01,
+                 min_probability=0.05, update_interval=50):
+        if min_probability * len(kinds) > 1:
+            raise ValueError(f"min_probability {min_probability} is too large for {len(kinds)} kinds")
+        self.kinds = list(kinds)
+        self.accept_reward = accept_reward
+        self.improve_reward = improve_reward
+        self.decay = decay
+        self.min_probability = min_probability
+        self.update_interval = update_interval
+        # Optimistic start, so every kind gets tried before the weights settle
+        self.quality = {kind: improve_reward for kind in self.kinds}
+        self.cumulative = []
+        self.moves_since_update = 0
+        self._update_probabilities()
+
+    def _update_probabilities(self):
+        total = sum(self.quality.values())
+        free = 1 - self.min_probability * len(self.kinds)
+        running = 0.0
+        self.cumulative = []
+        for kind in self.kinds:
+            share = self.quality[kind] / total if total > 0 else 1 / len(self.kinds)
+            running += self.min_probability + free * share
+            self.cumulative.append(running)
+        self.moves_since_update = 0
+
+    def select(self):
+        r = random.random() * self.cumulative[-1]
+        for kind, bound in zip(self.kinds, self.cumulative):
+            if r < bound:
+                return kind
+        return self.kinds[-1]
+
+    def record(self, kind, outcome):
+        if outcome == IMPROVING:
+            reward = self.improve_reward
+        elif outcome == ACCEPTED:
+            reward = self.accept_reward
+        else:
+            reward = 0.0
+        self.quality[kind] += self.decay * (reward - self.quality[kind])
+        self.moves_since_update += 1
+        if self.moves_since_update >= self.update_interval:
+            self._update_probabilities()
+
+    def probabilities(self):
+        """Current selection probability of each kind."""
+        previous = 0.0
+        result = {}
+        for kind, bound in zip(self.kinds, self.cumulative):
+            result[kind] = (bound - previous) / self.cumulative[-1]
+            previous = bound
+        return result
@@ -0,0 +1,177 @@
+import math
+import multiprocessing
+import random
+import time
+from simulated_annealing import generate_start_solution, metropolis_step, new_stats, finish_solution, initial_lower_bound
+from lower_bound import optimality_gap
+from operator_selection import AdaptiveOperatorSelector
+from solution import solution_from_assignments
+
+def geometric_ladder(T_min, T_max, num_replicas):
+    """Temperatures from T_min to T_max with a constant ratio between neighbours."""
+    if num_replicas == 1:
+        return [T_min]
+    ratio = (T_max / T_min) ** (1 / (num_replicas - 1))
+    return [T_min * ratio ** k for k in range(num_replicas)]
+
+def _replica_worker(conn, problem, seed, adaptive_operators=False):
+    """
+    Hold one replica and serve the master's commands:
+    ('run', T, steps) -> (current_cost, best_cost)
+    ('best',)         -> (best_cost, best_assignments, stats)
+    ('stop',)         -> exits
+    """
+    random.seed(seed)
+    current = generate_start_solution(problem)
+    best = current.copy()
+    stats = new_stats()
+    selector = AdaptiveOperatorSelector() if adaptive_operators else None
+    while True:
+        command = conn.recv()
+        if command[0] == 'run':
+            _, T, steps = command
+            for _ in range(steps):
+                if metropolis_step(problem, current, T, stats=stats, selector=selector) is not None and current.cost() < best.cost():
+                    best = current.copy()
+            stats['iterations'] += steps
+            conn.send((current.cost(), best.cost()))
+        elif command[0] == 'best':
+            conn.send((best.cost(), best.assignments, stats))
+        else:
+            break
+    conn.close()
+
+def parallel_tempering(problem, num_replicas=None, temperatures=None, T_min=5, T_max=500, exchange_interval=200,
+                       time_limit_minutes=15, max_rounds=None, seed=0, report_interval_seconds=10, verbose=True,
+                       on_improvement=None, stats=None, adaptive_operators=False, reoptimize_best=True,
+                       polish_best=True, finish_time_share=0.05, target_gap=None, lower_bound=None,
+                       bound_time_share=0.05):
+    """
+    Replica-exchange annealing: one replica per worker process, each running
+    the usual Metropolis moves at a fixed temperature from a ladder. Every
+    `exchange_interval` steps, replicas at neighbouring temperatures try to
+    swap with probability min(1, exp((E_i - E_j) * (1/T_i - 1/T_j))).
+
+    A swap exchanges the temperatures rather than the solutions, which is
+    equivalent and means no solution ever crosses a process boundary until the
+    final best is collected. Returns the best solution found by any replica.
+
+    on_improvement(round, elapsed_seconds, cost) is called when the best cost
+    over all replicas improves, and a stats dict receives the counters summed
+    over all replicas. With adaptive_operators=True every replica learns its
+    own neighbourhood weights (see operator_selection.py). polish_best and
+    reoptimize_best finish the returned solution as in simulated_annealing,
+    within the last finish_time_share of the time limit.
+
+    target_gap stops the exchange rounds once the best cost over all replicas
+    is within that fraction of lower_bound, which (if not given) is computed
+    within bound_time_share of the time limit. The gap is checked after every
+    round against the raw best cost; the bound and the final gap are stored
+    in stats['lower_bound'] and stats['gap'].
+    """
+    if temperatures is None:
+        temperatures = geometric_ladder(T_min, T_max, num_replicas or multiprocessing.cpu_count())
+    temperatures = sorted(temperatures)
+    num_replicas = len(temperatures)
+    rng = random.Random(seed)
+
+    connections = []
+    processes = []
+    for replica in range(num_replicas):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_replica_worker, args=(child_conn, problem, seed + replica, adaptive_operators), daemon=True)
+        process.start()
+        child_conn.close()
+        connections.append(parent_conn)
+        processes.append(process)
+
+    # ladder[k] is the replica currently running at temperatures[k]
+    ladder = list(range(num_replicas))
+    start_time = time.time()
+    time_limit_seconds = time_limit_minutes * 60
+    exchange_limit_seconds = time_limit_seconds
+    if polish_best or reoptimize_best:
+        exchange_limit_seconds *= 1 - finish_time_share
+    if target_gap is not None and lower_bound is None:
+        lower_bound = initial_lower_bound(problem, time_limit_seconds * bound_time_share)
+        if verbose:
+            print(f"Lower bound: {lower_bound}")
+    gap_reached = False
+    last_report = start_time
+    global_best = None
+    rounds = 0
+    swaps_attempted = [0] * (num_replicas - 1)
+    swaps_accepted = [0] * (num_replicas - 1)
+
+    try:
+        while time.time() - start_time < exchange_limit_seconds and (max_rounds is None or rounds < max_rounds):
+            rounds += 1
+            for k, replica in enumerate(ladder):
+                connections[replica].send(('run', temperatures[k], exchange_interval))
+            energies = [None] * num_replicas
+            for replica in range(num_replicas):
+                energies[replica], best_cost = connections[replica].recv()
+                if global_best is None or best_cost < global_best:
+                    global_best = best_cost
+                    if on_improvement is not None:
+                        on_improvement(rounds, time.time() - start_time, best_cost)
+
+            if target_gap is not None and optimality_gap(global_best, lower_bound) <= target_gap:
+                gap_reached = True
+                break
+
+            # Alternate between even and odd neighbour pairs so every pair gets its turn
+            for k in range(rounds % 2, num_replicas - 1, 2):
+                cold, hot = ladder[k], ladder[k + 1]
+                exponent = (energies[cold] - energies[hot]) * (1 / temperatures[k] - 1 / temperatures[k + 1])
+                swaps_attempted[k] += 1
+                if exponent >= 0 or rng.random() < math.exp(exponent):
+                    ladder[k], ladder[k + 1] = hot, cold
+                    swaps_accepted[k] += 1
+
+            if verbose and time.time() - last_report >= report_interval_seconds:
+                last_report = time.time()
+                print(f"{(last_report - start_time) / 60:.1f} min, round {rounds}: global best cost {global_best}, "
+                      f"coldest replica cost {energies[ladder[0]]}")
+
+        best_cost, best_assignments = None, None
+        if stats is not None:
+            stats.update(new_stats())
+        for conn in connections:
+            conn.send(('best',))
+            cost, assignments, replica_stats = conn.recv()
+            if stats is not None:
+                for key in ('iterations', 'moves_evaluated', 'moves_accepted'):
+                    stats[key] += replica_stats[key]
+            if best_cost is None or cost < best_cost:
+                best_cost, best_assignments = cost, assignments
+    finally:
+        for conn in connections:
+            try:
+                conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in processes:
+            process.join(timeout=5)
+
+    best = solution_from_assignments(problem, best_assignments)
+    finish_seconds = max(time_limit_seconds - (time.time() - start_time), 0)
+    if finish_solution(best, polish_best, reoptimize_best, time_limit_seconds=finish_seconds) < 0:
+        best_cost = best.cost()
+        if on_improvement is not None:
+            on_improvement(rounds, time.time() - start_time, best_cost)
+
+    if stats is not None:
+        stats['elapsed_seconds'] = time.time() - start_time
+        if lower_bound is not None:
+            stats['lower_bound'] = lower_bound
+            stats['gap'] = optimality_gap(best_cost, lower_bound)
+    if verbose:
+        if lower_bound is not None:
+            print(f"Lower bound: {lower_bound}, final gap: {optimality_gap(best_cost, lower_bound):.2%}"
+                  + (" (target reached)" if gap_reached else ""))
+        rates = [f"{accepted / attempted:.2f}" if attempted else "-" for accepted, attempted in zip(swaps_accepted, swaps_attempted)]
+        print(f"Parallel tempering finished after {rounds} rounds: best cost {best_cost}")
+        print(f"Temperatures: {[round(T, 2) for T in temperatures]}")
+        print(f"Swap acceptance rates: {rates}")
+    return best
@@ -1,47 +1,143 @@
-import re
-from models import Warehouse, Store, WarehouseLocationProblem
+import hashlib
+import os
+import numpy as np
+from models import Warehouse, Store, WarehouseLocationProblem, ProblemArrays, build_incompatibility_csr
 
-def parse_file(file_path):
-    warehouses = []
-    stores = []
-    supply_cost = []
-    incompatibilities = []
+CHUNK_SIZE = 1 << 20
+# Brackets, row separators and commas all become whitespace, leaving plain integers
+_NUMBER_TABLE = str.maketrans('[]|,', '    ')
+
+def _iter_statements(file):
+    """Stream `Name = value;` statements from a .dzn file, one chunk at a time."""
+    pending = ''
+    while True:
+        chunk = file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        start = 0
+        end = pending.find(';')
+        while end != -1:
+            name, _, value = pending[start:end].partition('=')
+            if value:
+                yield name.strip(), value
+            start = end + 1
+            end = pending.find(';', start)
+        pending = pending[start:]
+
+def _parse_numbers(value, out=None):
+    numbers = np.fromstring(value.translate(_NUMBER_TABLE), dtype=np.int64, sep=' ')
+    if out is None:
+        return numbers
+    if numbers.size != out.size:
+        raise ValueError(f"Expected {out.size} values, found {numbers.size}")
+    out.reshape(-1)[:] = numbers
+    return out
+
+def parse_arrays(file_path):
+    """
+    Parse a .dzn instance in a single streaming pass. Arrays are preallocated
+    from the Warehouses/Stores counts and filled directly from the file.
+
+    Returns (ProblemArrays, pairs) where pairs is the (k, 2) array of 0-based
+    incompatible store pairs in file order.
+    """
+    num_warehouses = num_stores = None
+    capacity = fixed_cost = demand = supply_cost = None
+    num_incompatibilities = 0
+    pairs = np.empty((0, 2), dtype=np.int32)
 
     with open(file_path, 'r') as file:
-        content = file.read()
-        
-        capacities = [int(x.strip()) for x in re.search(r'Capacity\s*=\s*\[(.*?)\];', content).group(1).split(',')]
-        fixed_costs = [int(x.strip()) for x in re.search(r'FixedCost\s*=\s*\[(.*?)\];', content).group(1).split(',')]
-        demands = [int(x.strip()) for x in re.search(r'Goods\s*=\s*\[(.*?)\];', content).group(1).split(',')]
-        
-        warehouses = [Warehouse(i, cap, cost) for i, (cap, cost) in enumerate(zip(capacities, fixed_costs))]
-        stores = [Store(i, demand) for i, demand in enumerate(demands)]
-        
-
-        supply_cost_match = re.search(r'SupplyCost\s*=\s*\[(.*?)\];', content, re.DOTALL)
-        if supply_cost_match:
-            matrix_str = supply_cost_match.group(1)
-
-            rows = matrix_str.strip().split('\n')
-            for row in rows:
-                row = row.strip()
-                if row and '|' in row:
-                    row = row.replace('|', '').strip()
-                    values = [int(x.strip()) for x in row.split(',') if x.strip()]
-                    if values:
-                        supply_cost.append(values)
-        
-        num_incompatibilities = 0
-        incomp_count_match = re.search(r'Incompatibilities\s*=\s*(\d+);', content)
-        if incomp_count_match:
-            num_incompatibilities = int(incomp_count_match.group(1))
-        
-        if num_incompatibilities > 0:
-            incomp_pairs_match = re.search(r'IncompatiblePairs\s*=\s*\[(.*?)\];', content, re.DOTALL)
-            if incomp_pairs_match:
-                pairs_str = incomp_pairs_match.group(1)
-                pairs = re.findall(r'\|\s*(\d+)\s*,\s*(\d+)\s*', pairs_str)
-                for pair in pairs:
-                    incompatibilities.append([int(pair[0]) - 1, int(pair[1]) - 1])
-
-    return WarehouseLocationProblem(warehouses, stores, supply_cost, incompatibilities) 
\ No newline at end of file
+        for name, value in _iter_statements(file):
+            if name == 'Warehouses':
+                num_warehouses = int(value)
+                capacity = np.empty(num_warehouses, dtype=np.int64)
+                fixed_cost = np.empty(num_warehouses, dtype=np.int64)
+            elif name == 'Stores':
+                num_stores = int(value)
+                demand = np.empty(num_stores, dtype=np.int64)
+            elif name == 'Capacity':
+                _parse_numbers(value, capacity)
+            elif name == 'FixedCost':
+                _parse_numbers(value, fixed_cost)
+            elif name == 'Goods':
+                _parse_numbers(value, demand)
+            elif name == 'SupplyCost':
+                supply_cost = _parse_numbers(value, np.empty((num_stores, num_warehouses), dtype=np.int32))
+            elif name == 'Incompatibilities':
+                num_incompatibilities = int(value)
+            elif name == 'IncompatiblePairs' and num_incompatibilities > 0:
+                pairs = _parse_numbers(value, np.empty((num_incompatibilities, 2), dtype=np.int32)) - 1
+
+    arrays = ProblemArrays(
+        capacity, fixed_cost, demand, supply_cost,
+        *build_incompatibility_csr(num_stores, pairs)
+    )
+    return arrays, pairs
+
+def build_problem(arrays, pairs):
+    """Build the object facade (Warehouse/Store/lists) around parsed arrays."""
+    warehouses = [
+        Warehouse(i, cap, cost)
+        for i, (cap, cost) in enumerate(zip(arrays.capacity.tolist(), arrays.fixed_cost.tolist()))
+    ]
+    stores = [Store(i, demand) for i, demand in enumerate(arrays.demand.tolist())]
+    supply_cost = arrays.supply_cost.tolist()
+    incompatibilities = np.asarray(pairs).tolist()
+    return WarehouseLocationProblem(warehouses, stores, supply_cost, incompatibilities, arrays)
+
+def _cache_path(file_path):
+    with open(file_path, 'rb') as file:
+        digest = hashlib.sha1(file.read()).hexdigest()[:16]
+    root, _ = os.path.splitext(file_path)
+    return f"{root}.{digest}.npz"
+
+def _load_cache(cache_file):
+    with np.load(cache_file) as data:
+        arrays = ProblemArrays(
+            data['capacity'], data['fixed_cost'], data['demand'], data['supply_cost'],
+            data['incompat_indptr'], data['incompat_indices']
+        )
+        return arrays, data['pairs']
+
+def _save_cache(cache_file, arrays, pairs):
+    # Write to a temporary file first so concurrent launches never read a partial cache
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as file:
+        np.savez(
+            file,
+            capacity=arrays.capacity, fixed_cost=arrays.fixed_cost, demand=arrays.demand,
+            supply_cost=arrays.supply_cost, incompat_indptr=arrays.incompat_indptr,
+            incompat_indices=arrays.incompat_indices, pairs=pairs
+        )
+    os.replace(tmp_file, cache_file)
+
+def load_arrays(file_path, use_cache=False):
+    """
+    (ProblemArrays, pairs) of a .dzn instance, as returned by parse_arrays.
+    With use_cache=True the parsed arrays are stored in an uncompressed .npz
+    next to the instance, keyed on the hash of the file contents, and later
+    calls load that file instead of parsing the text again.
+    """
+    if not use_cache:
+        return parse_arrays(file_path)
+
+    cache_file = _cache_path(file_path)
+    if os.path.exists(cache_file):
+        try:
+            return _load_cache(cache_file)
+        except (OSError, ValueError, KeyError):
+            pass  # Unreadable cache, fall back to parsing
+    arrays, pairs = parse_arrays(file_path)
+    try:
+        _save_cache(cache_file, arrays, pairs)
+    except OSError:
+        pass  # A read-only instance directory only disables the cache
+    return arrays, pairs
+
+def parse_file(file_path, use_cache=False):
+    """
+    Parse a .dzn instance into a WarehouseLocationProblem (see load_arrays
+    for use_cache).
+    """
+    return build_problem(*load_arrays(file_path, use_cache))
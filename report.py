@@ -0,0 +1,119 @@
+"""
+Reports and solution files of a solved instance.
+
+A report has one of three levels of detail:
+- summary: validity and costs
+- solution: the summary, the solution in triples format, the store
+  assignments, the warehouse usage and the open warehouses
+- full: the instance data followed by the solution report
+
+Reports are built in memory and written to the file (and the terminal) in a
+single call. Besides the triples format, the solution can be saved in a
+compact JSON or binary (.npz) file.
+"""
+import json
+import numpy as np
+
+REPORT_LEVELS = ('summary', 'solution', 'full')
+SOLUTION_FORMATS = {'text': 'txt', 'json': 'json', 'npz': 'npz'}
+
+def _instance_lines(problem):
+    lines = [
+        f"Warehouses: {len(problem.get_warehouses())}",
+        f"Stores: {len(problem.get_stores())}",
+        f"Incompatibilities: {len(problem.get_incompatibilities())}",
+        "\nWarehouse capacities:",
+    ]
+    lines.extend(f"Warehouse {w.id + 1}: Capacity={w.capacity}, Fixed Cost={w.fixed_cost}"
+                 for w in problem.get_warehouses())
+
+    lines.append("\nStore demands:")
+    lines.extend(f"Store {s.id + 1}: Demand={s.demand}" for s in problem.get_stores())
+
+    lines.append("\nSupply costs:")
+    lines.extend(f"Store {i + 1}: {row}" for i, row in enumerate(problem.get_supply_cost()))
+
+    lines.append("\nIncompatibilities:")
+    lines.extend(f"Store {pair[0] + 1} and Store {pair[1] + 1}" for pair in problem.get_incompatibilities())
+
+    lines.append("\nStore incompatibilities (from store objects):")
+    for s in problem.get_stores():
+        if s.incompatible_stores:
+            incomp_list = [str(store_id + 1) for store_id in s.incompatible_stores]
+            lines.append(f"Store {s.id + 1} is incompatible with: {', '.join(incomp_list)}")
+    return lines
+
+def _summary_lines(solution, is_valid, message):
+    total_cost, supply_cost, opening_cost = solution.get_total_cost()
+    return [
+        "\n--- SIMULATED ANNEALING SOLUTION ---",
+        f"Solution valid: {is_valid}",
+        f"Validation message: {message}",
+        f"Total cost: {total_cost} = {supply_cost} (supply cost) + {opening_cost} (opening cost)",
+    ]
+
+def _solution_lines(problem, solution):
+    lines = ["\nSolution in triples format:", format_triples(solution), "\nStore assignments:"]
+    for store_id, warehouses in enumerate(solution.by_store):
+        if warehouses:
+            lines.extend(f"Store {store_id + 1} → Warehouse {wh_id + 1}: {qty}" for wh_id, qty in warehouses.items())
+        else:
+            lines.append(f"Store {store_id + 1} → Not assigned")
+
+    lines.append("\nWarehouse usage:")
+    for wh in problem.get_warehouses():
+        usage = solution.usage[wh.id]
+        if usage > 0:
+            lines.append(f"Warehouse {wh.id + 1}: {usage}/{wh.capacity} ({usage/wh.capacity*100:.1f}%)")
+
+    lines.append("\nOpen warehouses:")
+    lines.append(f"{[wh_id + 1 for wh_id in solution.get_open_warehouses()]}")
+    return lines
+
+def format_triples(solution):
+    """The solution as {(store, warehouse, quantity), ...} with 1-based ids."""
+    return f"{{{', '.join([str(t) for t in solution.to_triples_format()])}}}"
+
+def format_report(problem, solution, is_valid, message, level='full'):
+    """The report of `solution` at one of REPORT_LEVELS, as a single string."""
+    if level not in REPORT_LEVELS:
+        raise ValueError(f"Unknown report level: {level}")
+    lines = _instance_lines(problem) if level == 'full' else []
+    lines.extend(_summary_lines(solution, is_valid, message))
+    if level != 'summary':
+        lines.extend(_solution_lines(problem, solution))
+    # The full report starts with the instance data, the others with the summary header
+    text = "\n".join(lines)
+    return text if level == 'full' else text.lstrip("\n")
+
+def write_report(problem, solution, is_valid, message, output_file, level='full', echo_level=None):
+    """
+    Write the report at `level` to output_file, and print the report at
+    `echo_level` unless it is None.
+    """
+    text = format_report(problem, solution, is_valid, message, level)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(text + "\n")
+    if echo_level is not None:
+        print(text if echo_level == level else format_report(problem, solution, is_valid, message, echo_level))
+
+def write_solution(solution, solution_file, solution_format='text'):
+    """
+    Write the solution in one of SOLUTION_FORMATS:
+    - text: the triples format
+    - json: {"cost": ..., "triples": [[store, warehouse, quantity], ...]}
+    - npz: a compressed int32 array of triples (numpy.load(...)['triples'])
+    Ids are 1-based in every format.
+    """
+    if solution_format == 'text':
+        with open(solution_file, 'w') as f:
+            f.write(format_triples(solution))
+    elif solution_format == 'json':
+        with open(solution_file, 'w') as f:
+            json.dump({'cost': solution.cost(), 'triples': solution.to_triples_format()}, f, separators=(',', ':'))
+    elif solution_format == 'npz':
+        with open(solution_file, 'wb') as f:
+            triples = np.array(solution.to_triples_format(), dtype=np.int32).reshape(-1, 3)
+            np.savez_compressed(f, triples=triples)
+    else:
+        raise ValueError(f"Unknown solution format: {solution_format}")
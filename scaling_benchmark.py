@@ -0,0 +1,148 @@
+"""
+Scaling benchmark on synthetic instances of growing size (see generator.py).
+
+Example:
+    python scaling_benchmark.py --scales 1 2 5 10 --seconds 20
+
+Scale k has k times the warehouses and stores of wlp05 (250 x 601 at k=1).
+Each size is measured in a fresh process: parse time, construction time,
+simulated annealing iterations/sec, time to finish the best solution (polish
+and re-optimization), and peak RSS after each phase. A phase that fails (for
+example a MemoryError, or the process being killed) is recorded along with
+the sizes that got that far. Results are written as JSON and summarised on stdout.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from parser import parse_file
+from generator import generate_instance, COST_STRUCTURES
+from simulated_annealing import simulated_annealing, generate_start_solution, finish_solution
+from validator import validate_solution
+from benchmark import _peak_rss_kb
+
+BASE_WAREHOUSES = 250
+BASE_STORES = 601
+
+def instance_path(directory, num_warehouses, num_stores, seed, generator_params):
+    """Path of the generated instance; a hash of the parameters is part of the name so files are reused safely."""
+    digest = hashlib.sha1(json.dumps(generator_params, sort_keys=True).encode()).hexdigest()[:8]
+    return os.path.join(directory, f"synthetic-{num_warehouses}x{num_stores}-s{seed}-{digest}.dzn")
+
+def measure(file_path, seed, seconds):
+    """Parse, construct, anneal and finish one instance, recording the time and peak RSS of each phase."""
+    record = {'instance': os.path.basename(file_path), 'file_mb': os.path.getsize(file_path) / 2 ** 20}
+    phase = 'parse'
+    try:
+        start = time.perf_counter()
+        problem = parse_file(file_path)
+        record['parse_seconds'] = time.perf_counter() - start
+        record['rss_after_parse_kb'] = _peak_rss_kb()
+
+        phase = 'construct'
+        random.seed(seed)
+        start = time.perf_counter()
+        initial = generate_start_solution(problem)
+        record['construct_seconds'] = time.perf_counter() - start
+        record['initial_valid'], _ = validate_solution(problem, initial)
+        record['initial_cost'] = initial.cost()
+        record['rss_after_construct_kb'] = _peak_rss_kb()
+
+        phase = 'anneal'
+        stats = {}
+        best = simulated_annealing(problem, max_iterations=None, time_limit_minutes=seconds / 60, seed=seed,
+                                   verbose=False, stats=stats, initial_solution=initial,
+                                   polish_best=False, reoptimize_best=False)
+        record['iterations'] = stats['iterations']
+        record['iterations_per_second'] = stats['iterations'] / stats['elapsed_seconds'] if stats['elapsed_seconds'] else None
+        record['annealed_cost'] = best.cost()
+        record['rss_after_anneal_kb'] = _peak_rss_kb()
+
+        phase = 'finish'
+        start = time.perf_counter()
+        finish_solution(best)
+        record['finish_seconds'] = time.perf_counter() - start
+        record['cost'] = best.cost()
+        record['valid'], _ = validate_solution(problem, best)
+        record['peak_rss_kb'] = _peak_rss_kb()
+    except MemoryError:
+        record['error'] = f"MemoryError during {phase}"
+    return record
+
+def run_scaling(scales, seed, seconds, directory, generator_params):
+    """Generate (or reuse) and measure one instance per scale, each in its own spawned process."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for scale in scales:
+        num_warehouses = max(1, round(BASE_WAREHOUSES * scale))
+        num_stores = max(1, round(BASE_STORES * scale))
+        file_path = instance_path(directory, num_warehouses, num_stores, seed, generator_params)
+        start = time.perf_counter()
+        if not os.path.exists(file_path):
+            generate_instance(file_path, num_warehouses, num_stores, seed=seed, **generator_params)
+        generate_seconds = time.perf_counter() - start
+
+        try:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                record = pool.submit(measure, file_path, seed, seconds).result()
+        except BrokenProcessPool:
+            record = {'instance': os.path.basename(file_path), 'error': 'process died (out of memory?)'}
+        record.update(scale=scale, warehouses=num_warehouses, stores=num_stores, generate_seconds=generate_seconds)
+        results.append(record)
+        print(format_row(record))
+    return results
+
+def format_row(record):
+    def fmt(key, spec, scale=1):
+        value = record.get(key)
+        return format(value * scale, spec) if value is not None else '-'
+
+    row = (f"x{record['scale']:<5g} {record['warehouses']:>6}wh {record['stores']:>7}st "
+           f"file={fmt('file_mb', '.1f')}MB parse={fmt('parse_seconds', '.2f')}s "
+           f"construct={fmt('construct_seconds', '.2f')}s it/s={fmt('iterations_per_second', '.0f')} "
+           f"finish={fmt('finish_seconds', '.2f')}s rss={fmt('peak_rss_kb', '.0f', 1 / 1024)}MB "
+           f"cost={fmt('cost', 'd')}")
+    if 'error' in record:
+        row += f" error={record['error']}"
+    return row
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--scales', nargs='+', type=float, default=[1, 2, 5, 10],
+                            help='sizes as multiples of wlp05 (250 warehouses x 601 stores)')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--seconds', type=float, default=20, help='annealing time per size')
+    arg_parser.add_argument('--instances-dir', default='tmp/scaling', help='where generated instances are kept')
+    arg_parser.add_argument('--tightness', type=float, default=0.45)
+    arg_parser.add_argument('--cost-structure', choices=COST_STRUCTURES, default='euclidean')
+    arg_parser.add_argument('--incompatibility-degree', type=float, default=30)
+    arg_parser.add_argument('--output', default=None, help='JSON file (default: tmp/benchmarks/scaling-<timestamp>.json)')
+    args = arg_parser.parse_args()
+
+    generator_params = {'tightness': args.tightness, 'cost_structure': args.cost_structure,
+                        'incompatibility_degree': args.incompatibility_degree}
+    started = datetime.datetime.now()
+    results = run_scaling(args.scales, args.seed, args.seconds, args.instances_dir, generator_params)
+
+    output = args.output or f"tmp/benchmarks/scaling-{started.strftime('%Y%m%d-%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'started': started.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'arguments': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+if __name__ == "__main__":
+    main()
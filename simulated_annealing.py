@@ -1,138 +1,359 @@
 import math
+import os
 import random
 import time
-from initial_solution import generate_initial_solution, generate_initial_solution_with_randomization
+from initial_solution import generate_initial_solution, generate_initial_solution_with_heap
 from validator import validate_solution
+from observers import ConsoleObserver, CallbackObserver, observes_moves, EMPTY, INFEASIBLE, REJECTED, ACCEPTED, IMPROVING
+from operator_selection import AdaptiveOperatorSelector
+from transport import reoptimize_flows
+from local_search import polish
+from checkpoint import save_checkpoint, load_checkpoint
+from lower_bound import lagrangian_bound, optimality_gap
 
-def simulated_annealing(problem, T_initial=500, T_min=5, alpha=0.9, inner_limit=30, max_iterations=50000, time_limit_minutes=15):
-    start_time = time.time()
+def _silent(*args, **kwargs):
+    pass
+
+def generate_start_solution(problem, log=_silent):
+    """Randomized priority-queue greedy start, falling back to the deterministic constructor if it is invalid."""
     randomization = random.uniform(0.2, 0.4)
-    current_solution = generate_initial_solution_with_randomization(problem, randomization=randomization)
+    solution = generate_initial_solution_with_heap(problem, randomization=randomization)
 
-    is_valid, message = validate_solution(problem, current_solution)
+    is_valid, message = validate_solution(problem, solution)
     if not is_valid:
-        print(f"Warning: Initial solution is invalid: {message}")
-        print("Attempting to fix initial solution...")
+        log(f"Warning: Initial solution is invalid: {message}")
+        log("Attempting to fix initial solution...")
         # If initial solution is invalid, try a different method
-        current_solution = generate_initial_solution(problem, ordering_operator="random")
-        is_valid, message = validate_solution(problem, current_solution)
-    
-    best_solution = current_solution
-    initial_cost, initial_supply_cost, initial_opening_cost = current_solution.get_total_cost()
-    print(f"Initial solution cost: {initial_cost} = {initial_supply_cost} (supply cost) + {initial_opening_cost} (opening cost)")
-    
+        solution = generate_initial_solution(problem, ordering_operator="random")
+    return solution
+
+def initial_lower_bound(problem, time_limit_seconds, upper_bound=None):
+    """
+    Lagrangian lower bound (see lower_bound.py) for a target-gap stop, computed
+    within time_limit_seconds. Without an upper_bound, the cost of a start
+    solution sets the step size.
+    """
+    if upper_bound is None:
+        upper_bound = generate_start_solution(problem).cost()
+    return lagrangian_bound(problem, upper_bound, time_limit_seconds=time_limit_seconds).bound
+
+def new_stats():
+    """Counters filled in by the solvers when a stats dict is passed to them."""
+    return {'iterations': 0, 'moves_evaluated': 0, 'moves_accepted': 0, 'elapsed_seconds': 0.0}
+
+def finish_solution(solution, polish_best=True, reoptimize_best=True, time_limit_seconds=None):
+    """
+    Descend to a local optimum, then re-optimize the quantities for the open
+    warehouses that leaves (and descend again if that helped), all within
+    time_limit_seconds if given. Works in place and returns the change in cost.
+    """
+    start_time = time.time()
+    cost_before = solution.cost()
+
+    def time_left():
+        return None if time_limit_seconds is None else max(time_limit_seconds - (time.time() - start_time), 0)
+
+    if polish_best:
+        polish(solution, time_limit_seconds=time_left())
+    if reoptimize_best and reoptimize_flows(solution, time_limit_seconds=time_left()) < 0 and polish_best:
+        polish(solution, time_limit_seconds=time_left())
+    return solution.cost() - cost_before
+
+def metropolis_step(problem, solution, T, debug=False, stats=None, move_observers=None, selector=None):
+    """
+    Propose one move and apply it in place if it is valid and passes the
+    Metropolis test at temperature T. Returns the cost delta of an accepted
+    move, or None if the solution is unchanged.
+
+    Only the constraints touched by the move are checked; with debug=True the
+    full validator also runs and must agree. If a stats dict is given, the
+    evaluated and accepted moves are counted in it, and every observer in
+    move_observers receives on_move with the move's outcome and wall time.
+    With a selector (see operator_selection.py) the neighbourhood is chosen
+    by it and the outcome is reported back to it; otherwise it is uniform.
+    """
+    if move_observers:
+        started = time.perf_counter()
+    move = solution.propose_move(selector.select() if selector is not None else None)
+    delta = None
+    if not move.changes:
+        outcome = EMPTY
+    else:
+        delta = solution.apply_move(move)
+        if stats is not None:
+            stats['moves_evaluated'] += 1
+
+        is_valid, message = solution.check_move(move)
+        if debug:
+            full_valid, full_message = validate_solution(problem, solution)
+            assert is_valid == full_valid, f"Move check ({message}) disagrees with validator ({full_message})"
+        if not is_valid:
+            # Roll back invalid moves
+            solution.undo_move(move)
+            outcome = INFEASIBLE
+        elif delta < 0 or random.random() < math.exp(-delta / T):
+            if stats is not None:
+                stats['moves_accepted'] += 1
+            outcome = IMPROVING if delta < 0 else ACCEPTED
+        else:
+            solution.undo_move(move)
+            outcome = REJECTED
+
+    if selector is not None:
+        selector.record(move.kind, outcome)
+    if move_observers:
+        seconds = time.perf_counter() - started
+        for observer in move_observers:
+            observer.on_move(move.kind, outcome, delta, seconds)
+    return delta if outcome == IMPROVING or outcome == ACCEPTED else None
+
+def simulated_annealing(problem, T_initial=500, T_min=5, alpha=0.9, inner_limit=30, max_iterations=50000, time_limit_minutes=15,
+                        seed=None, verbose=True, on_improvement=None, debug=False, stats=None,
+                        observers=None, clock_check_interval=100, progress_interval=1000, adaptive_operators=False,
+                        reoptimize_interval=None, reoptimize_best=True, polish_interval=None, polish_best=True,
+                        initial_solution=None, checkpoint_path=None, checkpoint_interval_seconds=60, resume=False,
+                        finish_time_share=0.05, target_gap=None, lower_bound=None, bound_time_share=0.05,
+                        gap_check_interval_seconds=10, gap_check_margin=0.1, gap_check_time_share=0.01):
+    """
+    Run simulated annealing on `problem` and return the best solution found.
+
+    - max_iterations: iteration limit, or None to run until the time limit
+    - seed: seeds the random module first, so a run can be reproduced
+    - verbose: print progress to stdout (attaches a ConsoleObserver)
+    - on_improvement: optional callback(iteration, elapsed_seconds, cost) called for the initial
+      solution and whenever the best cost improves
+    - debug: run the full validator after every move, not just on the initial and final solutions
+    - stats: optional dict (see new_stats) that receives iteration and move counters
+    - observers: AnnealingObserver instances notified of the run's events (see observers.py)
+    - clock_check_interval: the time limit is checked every this many iterations
+    - progress_interval: observers receive on_progress every this many iterations
+    - adaptive_operators: choose neighbourhoods with an AdaptiveOperatorSelector instead of uniformly;
+      the learned probabilities are stored in stats['operator_probabilities']
+    - reoptimize_interval: every this many iterations (checked between temperature levels) the current
+      solution's quantities are re-optimized for its open warehouses (see transport.py); None disables it
+    - reoptimize_best: re-optimize the quantities of the best solution before returning it
+    - polish_interval: every this many iterations (checked between temperature levels) the current
+      solution is taken to a local optimum by steepest descent (see local_search.py); None disables it
+    - polish_best: take the best solution to a local optimum before returning it
+    - finish_time_share: with polish_best or reoptimize_best, annealing stops this share of the time
+      limit early, and finishing the best solution (see finish_solution) gets the time that is left
+    - initial_solution: warm start from this Solution (e.g. from solution.load_solution) instead of
+      constructing one; it must be valid
+    - checkpoint_path: save the annealer state there every checkpoint_interval_seconds (checked between
+      temperature levels) and at the end (see checkpoint.py)
+    - resume: continue from the checkpoint at checkpoint_path if it exists and its run did not finish;
+      the iteration count, the elapsed time (which counts towards the limits), the temperature and the
+      random state carry over. A run that ends normally marks its last checkpoint finished
+    - target_gap: stop once (best cost - lower bound) / best cost is at most this (e.g. 0.01). The gap is
+      checked between temperature levels. When the gap is close enough to the target that finishing the
+      best solution might close the rest of it, a copy is finished (see finish_solution) within
+      gap_check_time_share of the time limit, at most every gap_check_interval_seconds, and returned if
+      it is cheaper. "Close enough" is gap_check_margin at first, then the gap the previous finish closed
+    - lower_bound: a known lower bound on the optimal cost; with target_gap and no lower_bound, a
+      Lagrangian bound (see lower_bound.py) is computed within bound_time_share of the time limit.
+      The bound and the final gap are stored in stats['lower_bound'] and stats['gap']
+    """
+    start_time = time.time()
+    if seed is not None:
+        random.seed(seed)
+    if stats is not None:
+        stats.update(new_stats())
+    log = print if verbose else _silent
+    observers = list(observers or [])
+    if verbose:
+        observers.insert(0, ConsoleObserver())
+    if on_improvement is not None:
+        observers.append(CallbackObserver(on_improvement))
+    move_observers = [observer for observer in observers if observes_moves(observer)]
+    time_limit_seconds = time_limit_minutes * 60
+    iteration_limit = math.inf if max_iterations is None else max_iterations
+    # Annealing leaves the rest of the time limit to finish_solution
+    anneal_limit_seconds = time_limit_seconds
+    if polish_best or reoptimize_best:
+        anneal_limit_seconds *= 1 - finish_time_share
+
+    def time_left(limit_seconds):
+        return max(limit_seconds - (time.time() - start_time), 0)
+
+    selector = AdaptiveOperatorSelector() if adaptive_operators else None
+
     T = T_initial
     iteration = 0
+    resumed = None
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        resumed = load_checkpoint(checkpoint_path, problem)
+        if resumed.finished:
+            log(f"Checkpoint {checkpoint_path} is of a finished run; starting a new one")
+            resumed = None
+    if resumed is not None:
+        log(f"Resuming from {checkpoint_path} at iteration {resumed.iteration}")
+        start_time -= resumed.elapsed_seconds
+        random.setstate(resumed.random_state)
+        current_solution, best_solution = resumed.current, resumed.best
+        T, iteration = resumed.T, resumed.iteration
+    elif initial_solution is not None:
+        is_valid, message = validate_solution(problem, initial_solution)
+        if not is_valid:
+            raise ValueError(f"Initial solution is invalid: {message}")
+        current_solution = initial_solution.copy()
+        best_solution = current_solution.copy()
+    else:
+        current_solution = generate_start_solution(problem, log)
+        best_solution = current_solution.copy()
     best_cost = best_solution.cost()
-    
-    print(f"Starting simulated annealing with max iterations: {max_iterations}")
-    print(f"Annealing parameters: T_initial={T_initial}, T_min={T_min}, alpha={alpha}, inner_limit={inner_limit}")
-    print(f"Time limit: {time_limit_minutes} minutes")
-    print(f"Initial temperature: {T:.2f}")
 
-    # Create a record of best solutions over time
-    iteration_records = [(0, best_cost)]
-    last_record_iteration = 0
+    if target_gap is not None and lower_bound is None:
+        lower_bound = initial_lower_bound(problem, time_limit_seconds * bound_time_share, best_cost)
+        log(f"Lower bound: {lower_bound} (gap of the initial solution: {optimality_gap(best_cost, lower_bound):.2%})")
+    finished_best = None  # Finished copy of the best solution, made for the gap checks
+    finished_from = None  # Cost of the best solution it was made from
+    finish_gain = gap_check_margin  # Gap a finish is expected to close, from the last one made
+    last_gap_check = time.time()
+    gap_reached = False
+
+    params = dict(T_initial=T_initial, T_min=T_min, alpha=alpha, inner_limit=inner_limit,
+                  max_iterations=max_iterations, time_limit_minutes=time_limit_minutes)
+    for observer in observers:
+        observer.on_start(best_solution, time.time() - start_time, params)
+
+    last_reoptimized = last_polished = iteration
+    last_checkpoint = time.time()
+    time_up = False
 
     # Continue until max iterations is reached (primary condition)
-    while iteration < max_iterations:
-        current_time = time.time()
-        elapsed_minutes = (current_time - start_time) / 60
-        if elapsed_minutes >= time_limit_minutes:
-            print(f"Time limit of {time_limit_minutes} minutes reached after {iteration} iterations")
+    while iteration < iteration_limit and not time_up:
+        if time.time() - start_time >= anneal_limit_seconds:
             break
-            
+
         # Reset temperature if it gets too low to continue exploring
         if T <= T_min:
-            print(f"Temperature reached minimum ({T_min}), resetting to {T_initial}")
+            for observer in observers:
+                observer.on_temperature(iteration, T, T_initial, 'reset', 0)
             T = T_initial
-        
+
         improved = False
         iter_at_this_temp = 0
-        
+
         for _ in range(inner_limit):
             iteration += 1
             iter_at_this_temp += 1
-            
-            if (time.time() - start_time) / 60 >= time_limit_minutes:
-                print(f"Time limit of {time_limit_minutes} minutes reached during inner loop")
+
+            if iteration % clock_check_interval == 0 and time.time() - start_time >= anneal_limit_seconds:
+                time_up = True
                 break
-                
-            if iteration % 1000 == 0:
+
+            if iteration % progress_interval == 0 and observers:
                 elapsed_time = time.time() - start_time
-                elapsed_minutes = elapsed_time / 60
-                iteration_records.append((iteration, best_cost))
-                print(f"Iteration {iteration} ({elapsed_minutes:.1f} min): Current temperature: {T:.2f}, Best cost: {best_cost}")
-                
-            if iteration >= max_iterations:
-                print(f"Reached maximum iterations limit ({max_iterations})")
+                for observer in observers:
+                    observer.on_progress(iteration, elapsed_time, T, current_solution.cost(), best_cost)
+
+            if iteration >= iteration_limit:
                 break
-                
-            neighbor = current_solution.copy_and_perturb()
-            
-            is_valid, message = validate_solution(problem, neighbor)
-            if not is_valid:
-                # Skip invalid solutions
-                continue
-                
-            delta = neighbor.cost() - current_solution.cost()
 
             # Accept the new solution if it's better or with a probability based on temperature
-            if delta < 0 or random.random() < math.exp(-delta / T):
-                current_solution = neighbor
+            if metropolis_step(problem, current_solution, T, debug, stats, move_observers, selector) is not None:
                 improved = True
-                
-                # Update best solution if this is better
+
+                # Snapshot the best solution only when it improves
                 if current_solution.cost() < best_cost:
-                    best_solution = neighbor
+                    best_solution = current_solution.copy()
                     best_cost = best_solution.cost()
-                    last_improvement_iteration = iteration
                     elapsed_time = time.time() - start_time
-                    elapsed_minutes = elapsed_time / 60
-                    print(f"Iteration {iteration} ({elapsed_minutes:.1f} min): Found better solution with cost {best_cost}")
-        
-        if (time.time() - start_time) / 60 >= time_limit_minutes:
+                    for observer in observers:
+                        observer.on_improvement(iteration, elapsed_time, best_cost)
+
+        if time_up or time.time() - start_time >= anneal_limit_seconds:
             break
-            
+
+        # Intensify: exact quantities for the open warehouses, or a descent to the nearest local optimum
+        intensified = False
+        if reoptimize_interval and iteration - last_reoptimized >= reoptimize_interval:
+            last_reoptimized = iteration
+            intensified = reoptimize_flows(current_solution, time_limit_seconds=time_left(anneal_limit_seconds)) < 0
+        if polish_interval and iteration - last_polished >= polish_interval:
+            last_polished = iteration
+            intensified = polish(current_solution, time_limit_seconds=time_left(anneal_limit_seconds)) < 0 or intensified
+        if intensified and current_solution.cost() < best_cost:
+            best_solution = current_solution.copy()
+            best_cost = best_solution.cost()
+            elapsed_time = time.time() - start_time
+            for observer in observers:
+                observer.on_improvement(iteration, elapsed_time, best_cost)
+
+        if target_gap is not None:
+            raw_gap = optimality_gap(best_cost, lower_bound)
+            reached_cost = best_cost if finished_best is None else min(best_cost, finished_best.cost())
+            gap = optimality_gap(reached_cost, lower_bound)
+            # Finishing is worth trying only when it could close the rest of the gap
+            if (gap > target_gap and raw_gap <= target_gap + finish_gain and finished_from != best_cost
+                    and time.time() - last_gap_check >= gap_check_interval_seconds):
+                finished_from = best_cost
+                candidate = best_solution.copy()
+                finish_solution(candidate, polish_best, reoptimize_best,
+                                time_limit_seconds=min(time_limit_seconds * gap_check_time_share,
+                                                       time_left(anneal_limit_seconds)))
+                last_gap_check = time.time()
+                finish_gain = raw_gap - optimality_gap(candidate.cost(), lower_bound)
+                if finished_best is None or candidate.cost() < finished_best.cost():
+                    finished_best = candidate
+                log(f"Iteration {iteration}: finished best cost {finished_best.cost()}, "
+                    f"gap {optimality_gap(finished_best.cost(), lower_bound):.2%}")
+                gap = optimality_gap(min(best_cost, finished_best.cost()), lower_bound)
+            if gap <= target_gap:
+                gap_reached = True
+                break
+
         # Reduce temperature
         old_T = T
         T *= alpha
-        
-        if iter_at_this_temp > 0 and improved:
-            print(f"Temperature decreased: {old_T:.2f} -> {T:.2f} (after {iter_at_this_temp} iterations at this temperature)")
-            
         if not improved and iteration > 100:
-            T *= alpha 
-            print(f"No improvement at temperature {old_T:.2f}, accelerating to {T:.2f}")
+            T *= alpha
+            reason = 'accelerated'
+        else:
+            reason = 'cooled'
+        for observer in observers:
+            observer.on_temperature(iteration, old_T, T, reason, iter_at_this_temp)
+
+        # Saved between temperature levels, so a resumed run continues exactly where this one was
+        if checkpoint_path is not None and time.time() - last_checkpoint >= checkpoint_interval_seconds:
+            last_checkpoint = time.time()
+            save_checkpoint(checkpoint_path, current_solution, best_solution, T, iteration, last_checkpoint - start_time)
+
+    if checkpoint_path is not None:
+        save_checkpoint(checkpoint_path, current_solution, best_solution, T, iteration, time.time() - start_time,
+                        finished=True)
+
+    # A gap check may have finished the current best solution already, possibly cut short by its budget
+    finished = finished_best if finished_best is not None and finished_from == best_cost else best_solution
+    finish_solution(finished, polish_best, reoptimize_best, time_limit_seconds=time_left(time_limit_seconds))
+    if finished_best is not None and finished_best.cost() < finished.cost():
+        finished = finished_best
+    if finished.cost() < best_cost:
+        best_solution = finished
+        best_cost = best_solution.cost()
+        for observer in observers:
+            observer.on_improvement(iteration, time.time() - start_time, best_cost)
 
     total_time = time.time() - start_time
-    total_minutes = total_time / 60
-    
-    print(f"\nSimulated annealing completed after {iteration} iterations ({total_minutes:.2f} minutes)")
-    
-    if total_minutes >= time_limit_minutes:
-        print(f"Terminated due to reaching time limit of {time_limit_minutes} minutes")
-    else:
-        print(f"Completed due to reaching maximum iterations limit ({max_iterations})")
-    
-    final_cost, final_supply_cost, final_opening_cost = best_solution.get_total_cost()
-    print(f"Final solution cost: {final_cost} = {final_supply_cost} (supply cost) + {final_opening_cost} (opening cost)")
-    
-    if final_cost < initial_cost:
-        improvement = initial_cost - final_cost
-        improvement_percent = (improvement / initial_cost) * 100
-        print(f"Improvement: {improvement} ({improvement_percent:.2f}%)")
+    if stats is not None:
+        stats['iterations'] = iteration
+        stats['elapsed_seconds'] = total_time
+        if selector is not None:
+            stats['operator_probabilities'] = selector.probabilities()
+        if lower_bound is not None:
+            stats['lower_bound'] = lower_bound
+            stats['gap'] = optimality_gap(best_cost, lower_bound)
+    if lower_bound is not None:
+        log(f"Lower bound: {lower_bound}, final gap: {optimality_gap(best_cost, lower_bound):.2%}")
+
+    if gap_reached:
+        reason = 'target_gap'
     else:
-        print(f"No improvement from initial solution")
-    
-    print("\nImprovement over iterations:")
-    for iter_num, cost in iteration_records:
-        print(f"At iteration {iter_num}: Cost = {cost}")
-    
+        reason = 'max_iterations' if iteration >= iteration_limit else 'time_limit'
     is_valid, message = validate_solution(problem, best_solution)
-    if not is_valid:
-        print(f"Error: Final solution is invalid: {message}")
-    else:
-        print("Final solution is valid.")
-    
-    return best_solution
\ No newline at end of file
+    for observer in observers:
+        observer.on_finish(iteration, total_time, best_solution, reason, is_valid, message)
+    if selector is not None:
+        log("Operator probabilities: " + ", ".join(f"{kind}={p:.2f}" for kind, p in selector.probabilities().items()))
+
+    return best_solution
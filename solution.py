@@ -1,229 +1,543 @@
-from utils import order_warehouses_by_cost_efficiency
+from models import OPEN_CANDIDATE_COUNT
+from utils import read_solution_file
 import random
-import copy
+
+class Move:
+    """
+    A reversible change to a solution, stored as a list of
+    (store_id, warehouse_id, quantity_change) entries.
+    """
+    __slots__ = ('kind', 'changes', 'delta')
+
+    def __init__(self, kind, changes):
+        self.kind = kind
+        self.changes = changes
+        self.delta = 0  # Cost change, filled in by Solution.apply_move
+
+# Move kind -> Solution method that proposes it
+NEIGHBOURHOODS = {
+    'reassign': 'tweak_reassign_warehouses',
+    'transfer': 'tweak_transfer_between_warehouses',
+    'split': 'tweak_split_store_demand',
+    'merge': 'tweak_merge_store_assignments',
+    'close': 'tweak_close_warehouse',
+    'open': 'tweak_open_warehouse',
+    'swap': 'tweak_swap_warehouses',
+}
+MOVE_KINDS = list(NEIGHBOURHOODS)
+
+class _RandomAccessSet:
+    """A set of store ids with O(1) add, discard and uniform random choice."""
+    __slots__ = ('items', 'positions')
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        position = self.positions.pop(item, None)
+        if position is not None:
+            last = self.items.pop()
+            if position < len(self.items):
+                self.items[position] = last
+                self.positions[last] = position
+
+    def choice(self):
+        return random.choice(self.items)
+
+    def copy(self):
+        snapshot = _RandomAccessSet()
+        snapshot.items = list(self.items)
+        snapshot.positions = dict(self.positions)
+        return snapshot
+
+    def __len__(self):
+        return len(self.items)
 
 class Solution:
+    """
+    Assignments indexed both ways: by_store[store_id] maps warehouse_id -> quantity
+    and by_warehouse[warehouse_id] maps store_id -> quantity, so changing one
+    entry is O(1). Use to_triples_format() for output.
+    """
+    __slots__ = ('problem', 'by_store', 'by_warehouse', 'usage', '_conflicts', 'split_stores', 'mergeable_stores',
+                 'open_set', 'supply_cost', 'opening_cost')
+
     def __init__(self, problem):
         self.problem = problem
-        self.assignments = []  # List of (store_id, warehouse_id, quantity)
-        
+        self.by_store = [{} for _ in problem.get_stores()]
+        self.by_warehouse = [{} for _ in problem.get_warehouses()]
+        self.usage = [0] * len(problem.get_warehouses())  # Goods taken from each warehouse
+        self._conflicts = [{} for _ in problem.get_warehouses()]  # See the conflicts property
+        self.split_stores = _RandomAccessSet()  # Stores with one warehouse supplying more than 1 unit
+        self.mergeable_stores = _RandomAccessSet()  # Stores supplied by more than one warehouse
+        self.open_set = _RandomAccessSet()  # Open warehouses
+        self.supply_cost = 0  # Running supply cost of all assignments
+        self.opening_cost = 0  # Running fixed cost of all open warehouses
+
+    @property
+    def assignments(self):
+        """List of 0-based (store_id, warehouse_id, quantity), ordered by store."""
+        return [(store_id, wh_id, qty) for store_id, warehouses in enumerate(self.by_store)
+                for wh_id, qty in warehouses.items()]
+
     def add_assignment(self, store_id, warehouse_id, quantity):
-        self.assignments.append((store_id, warehouse_id, quantity))
-        self.problem.get_warehouses()[warehouse_id].add_usage(quantity)
-        
+        self._change_quantity(store_id, warehouse_id, quantity)
+
+    def _change_quantity(self, store_id, warehouse_id, quantity):
+        """Add `quantity` units (negative to remove) to the (store, warehouse) assignment."""
+        warehouses = self.by_store[store_id]
+        q = warehouses.get(warehouse_id, 0) + quantity
+        if q == 0:
+            # Released first: a snapshot rebuilds its conflict index from by_warehouse on first use
+            self._update_conflicts(store_id, warehouse_id, -1)
+            del warehouses[warehouse_id]
+            del self.by_warehouse[warehouse_id][store_id]
+        else:
+            if warehouse_id not in warehouses:
+                self._update_conflicts(store_id, warehouse_id, 1)
+            warehouses[warehouse_id] = q
+            self.by_warehouse[warehouse_id][store_id] = q
+        self._classify_store(store_id)
+        self._account(store_id, warehouse_id, quantity)
+
+    def _classify_store(self, store_id):
+        """Keep split_stores and mergeable_stores up to date for the store's current assignments."""
+        warehouses = self.by_store[store_id]
+        if len(warehouses) > 1:
+            self.mergeable_stores.add(store_id)
+            self.split_stores.discard(store_id)
+        else:
+            self.mergeable_stores.discard(store_id)
+            if len(warehouses) == 1 and next(iter(warehouses.values())) > 1:
+                self.split_stores.add(store_id)
+            else:
+                self.split_stores.discard(store_id)
+
+    @property
+    def conflicts(self):
+        """
+        conflicts[wh_id][store_id]: number of stores supplied by wh_id that are
+        incompatible with store_id. Snapshots (see copy) leave it out, and it is
+        rebuilt from the assignments on first use.
+        """
+        if self._conflicts is None:
+            self._conflicts = [{} for _ in self.problem.get_warehouses()]
+            for wh_id, stores in enumerate(self.by_warehouse):
+                for store_id in stores:
+                    self._update_conflicts(store_id, wh_id, 1)
+        return self._conflicts
+
+    def _update_conflicts(self, store_id, warehouse_id, step):
+        """Register (step=1) or release (step=-1) the store's incompatibilities at a warehouse."""
+        conflicts = self.conflicts[warehouse_id]
+        incompatible = self.problem.get_stores()[store_id].incompatible_stores
+        if step > 0:
+            get = conflicts.get
+            for other_id in incompatible:
+                conflicts[other_id] = get(other_id, 0) + 1
+        else:
+            for other_id in incompatible:
+                count = conflicts[other_id] - 1
+                if count:
+                    conflicts[other_id] = count
+                else:
+                    del conflicts[other_id]
+
+    def is_compatible(self, store_id, warehouse_id):
+        """True if no store incompatible with `store_id` is supplied by `warehouse_id`."""
+        return store_id not in self.conflicts[warehouse_id]
+
+    def _account(self, store_id, warehouse_id, quantity):
+        """
+        Update warehouse usage and the running cost totals for `quantity` units
+        (negative to remove) flowing from `warehouse_id` to `store_id`.
+        """
+        was_open = self.usage[warehouse_id] > 0
+        self.usage[warehouse_id] += quantity
+        is_open = self.usage[warehouse_id] > 0
+        self.supply_cost += self.problem.get_supply_cost()[store_id][warehouse_id] * quantity
+        if is_open and not was_open:
+            self.opening_cost += self.problem.get_warehouses()[warehouse_id].fixed_cost
+            self.open_set.add(warehouse_id)
+        elif was_open and not is_open:
+            self.opening_cost -= self.problem.get_warehouses()[warehouse_id].fixed_cost
+            self.open_set.discard(warehouse_id)
+
+    def is_open(self, warehouse_id):
+        """A warehouse is open exactly when goods are taken from it."""
+        return self.usage[warehouse_id] > 0
+
+    def get_remaining_capacity(self, warehouse_id):
+        return self.problem.get_warehouses()[warehouse_id].capacity - self.usage[warehouse_id]
+
+    def get_open_warehouses(self):
+        return [wh_id for wh_id, used in enumerate(self.usage) if used > 0]
+
+    def candidate_warehouses(self, store_id):
+        """
+        Warehouses that moves consider for the store (see
+        WarehouseLocationProblem.set_candidate_count). With include_open, a random
+        sample of at most OPEN_CANDIDATE_COUNT open warehouses is added, so the
+        cost does not grow with the number of open warehouses.
+        """
+        candidates = self.problem.get_candidate_warehouses(store_id)
+        if not self.problem.candidates_include_open:
+            return candidates
+        open_ids = self.open_set.items
+        sampled = random.sample(open_ids, min(OPEN_CANDIDATE_COUNT, len(open_ids)))
+        listed = set(candidates)
+        return candidates + [wh_id for wh_id in sampled if wh_id not in listed]
+
     def get_store_assignments(self):
-        store_assignments = {}
-        for store_id, wh_id, qty in self.assignments:
-            if store_id not in store_assignments:
-                store_assignments[store_id] = []
-            store_assignments[store_id].append((wh_id, qty))
-        return store_assignments
+        """Dict of store_id -> [(warehouse_id, quantity)] for the stores that are supplied."""
+        return {store_id: list(warehouses.items()) for store_id, warehouses in enumerate(self.by_store) if warehouses}
 
     def get_total_cost(self):
-        supply_cost = 0
-        opening_cost = 0
-        for store_id, wh_id, quantity in self.assignments:
-            supply_cost += self.problem.get_supply_cost()[store_id][wh_id] * quantity
-        for warehouse in self.problem.get_warehouses():
-            if warehouse.is_open:
-                opening_cost += warehouse.fixed_cost
-        return supply_cost + opening_cost, supply_cost, opening_cost
+        return self.supply_cost + self.opening_cost, self.supply_cost, self.opening_cost
 
     def to_triples_format(self):
         triples = []
-        for store_id, wh_id, quantity in self.assignments:
-            triples.append((store_id + 1, wh_id + 1, quantity))
+        for store_id, warehouses in enumerate(self.by_store):
+            for wh_id, quantity in warehouses.items():
+                triples.append((store_id + 1, wh_id + 1, quantity))
         return triples
-    
+
     def cost(self):
         """Returns only the total cost (used by Simulated Annealing)."""
-        return self.get_total_cost()[0]
+        return self.supply_cost + self.opening_cost
 
+    def copy(self):
+        """
+        Snapshot of the assignments and costs; the problem is shared, not copied.
+        The conflict index is left out, since most snapshots (of each new best
+        solution) are never changed, and rebuilt if the snapshot is.
+        """
+        # Skip __init__: every field is replaced below
+        snapshot = Solution.__new__(Solution)
+        snapshot.problem = self.problem
+        snapshot.by_store = [dict(w) for w in self.by_store]
+        snapshot.by_warehouse = [dict(s) for s in self.by_warehouse]
+        snapshot.split_stores = self.split_stores.copy()
+        snapshot.mergeable_stores = self.mergeable_stores.copy()
+        snapshot.open_set = self.open_set.copy()
+        snapshot.usage = list(self.usage)
+        snapshot._conflicts = None
+        snapshot.supply_cost = self.supply_cost
+        snapshot.opening_cost = self.opening_cost
+        return snapshot
 
-    def copy_and_perturb(self):
-        new_solution = copy.deepcopy(self)
-        strategy = random.choice([
-            'tweak_reassign_warehouses',
-            'tweak_transfer_between_warehouses',
-            'tweak_split_store_demand',
-            'tweak_merge_store_assignments'
-        ])
-        return getattr(new_solution, strategy)()
+    def propose_move(self, kind=None):
+        """
+        Return a Move from the neighbourhood `kind` (one of MOVE_KINDS, random
+        if not given). The move has no changes if the neighbourhood had nothing
+        to change.
+        """
+        if kind is None:
+            kind = random.choice(MOVE_KINDS)
+        move = getattr(self, NEIGHBOURHOODS[kind])()
+        return move if move is not None else Move(kind, [])
+
+    def apply_move(self, move):
+        cost_before = self.cost()
+        for store_id, wh_id, qty in move.changes:
+            self._change_quantity(store_id, wh_id, qty)
+        move.delta = self.cost() - cost_before
+        return move.delta
+
+    def undo_move(self, move):
+        for store_id, wh_id, qty in reversed(move.changes):
+            self._change_quantity(store_id, wh_id, -qty)
+
+    def check_move(self, move):
+        """
+        Check an applied move against only the constraints it touches: the
+        capacity of warehouses that received goods, the incompatibilities of
+        stores added to a warehouse, and the demand of the moved stores.
+
+        Returns a tuple (is_valid, error_message)
+        """
+        net_supply = {}
+        for store_id, wh_id, qty in move.changes:
+            net_supply[store_id] = net_supply.get(store_id, 0) + qty
+            if qty > 0:
+                if self.usage[wh_id] > self.problem.get_warehouses()[wh_id].capacity:
+                    return False, f"Warehouse {wh_id+1} is overloaded: {self.usage[wh_id]} > {self.problem.get_warehouses()[wh_id].capacity}"
+                if not self.is_compatible(store_id, wh_id):
+                    return False, f"Store {store_id+1} is incompatible with a store supplied by warehouse {wh_id+1}"
+        for store_id, change in net_supply.items():
+            if change != 0:
+                return False, f"Store {store_id+1} demand not satisfied: supply changed by {change}"
+        return True, "Move is valid"
 
     def tweak_reassign_warehouses(self):
         problem = self.problem
         store_id = random.randint(0, len(problem.get_stores()) - 1)
         store = problem.get_stores()[store_id]
-        self.assignments = [
-            (s_id, wh_id, qty) for (s_id, wh_id, qty) in self.assignments if s_id != store_id
-        ]
-        for warehouse in problem.get_warehouses():
-            warehouse.current_usage = 0
-            warehouse.is_open = False
-        for s_id, wh_id, qty in self.assignments:
-            problem.get_warehouses()[wh_id].add_usage(qty)
+        # Quantities currently sent to this store count as free capacity for the reassignment
+        freed = dict(self.by_store[store_id])
+        remaining = {}
         available_warehouses = []
         demand = store.demand
-        for wh_id, warehouse in enumerate(problem.get_warehouses()):
-            if warehouse.get_remaining_capacity() > 0:
-                incompatible = any(
-                    store_id in problem.get_stores()[s_id].incompatible_stores
-                    for (s_id, wid, _) in self.assignments if wid == wh_id
-                )
-                if not incompatible:
-                    available_warehouses.append(wh_id)
+        for wh_id in self.candidate_warehouses(store_id):
+            remaining[wh_id] = self.get_remaining_capacity(wh_id) + freed.get(wh_id, 0)
+            if remaining[wh_id] > 0 and self.is_compatible(store_id, wh_id):
+                available_warehouses.append(wh_id)
         random.shuffle(available_warehouses)
+        new_quantities = {}
         while demand > 0 and available_warehouses:
             wh_id = available_warehouses.pop(0)
-            warehouse = problem.get_warehouses()[wh_id]
             if random.random() < 0.5 and len(available_warehouses) > 0:
-                max_qty = min(demand, warehouse.get_remaining_capacity())
+                max_qty = min(demand, remaining[wh_id])
                 quantity = random.randint(1, max_qty) if max_qty > 1 else max_qty
             else:
-                quantity = min(demand, warehouse.get_remaining_capacity())
+                quantity = min(demand, remaining[wh_id])
             if quantity > 0:
-                self.add_assignment(store_id, wh_id, quantity)
+                new_quantities[wh_id] = new_quantities.get(wh_id, 0) + quantity
+                remaining[wh_id] -= quantity
                 demand -= quantity
         if demand > 0:
-            from utils import order_warehouses_by_cost_efficiency
-            for wh_id in order_warehouses_by_cost_efficiency(problem.get_warehouses()):
-                warehouse = problem.get_warehouses()[wh_id]
-                if warehouse.get_remaining_capacity() == 0:
-                    continue
-                incompatible = any(
-                    store_id in problem.get_stores()[s_id].incompatible_stores
-                    for (s_id, wid, _) in self.assignments if wid == wh_id
-                )
-                if incompatible:
+            # The candidates could not take the whole demand; fall back to the longer precomputed list
+            for wh_id in problem.get_fallback_warehouses(store_id):
+                if wh_id not in remaining:
+                    remaining[wh_id] = self.get_remaining_capacity(wh_id) + freed.get(wh_id, 0)
+                if remaining[wh_id] <= 0 or not self.is_compatible(store_id, wh_id):
                     continue
-                quantity = min(demand, warehouse.get_remaining_capacity())
-                self.add_assignment(store_id, wh_id, quantity)
+                quantity = min(demand, remaining[wh_id])
+                new_quantities[wh_id] = new_quantities.get(wh_id, 0) + quantity
+                remaining[wh_id] -= quantity
                 demand -= quantity
                 if demand == 0:
                     break
-        return self
+        changes = []
+        for wh_id in set(freed) | set(new_quantities):
+            change = new_quantities.get(wh_id, 0) - freed.get(wh_id, 0)
+            if change != 0:
+                changes.append((store_id, wh_id, change))
+        # Removals first, so no intermediate state exceeds a warehouse's capacity
+        changes.sort(key=lambda change: change[2])
+        return Move('reassign', changes)
 
     def tweak_transfer_between_warehouses(self):
-        problem = self.problem
-        store_assignments = self.get_store_assignments()
-        if not store_assignments:
-            return self
-        store_id = random.choice(list(store_assignments.keys()))
-        assignments = store_assignments[store_id]
-        if len(assignments) == 0:
-            return self
-        source_wh_id, qty = random.choice(assignments)
-        for warehouse in problem.get_warehouses():
-            warehouse.current_usage = 0
-            warehouse.is_open = False
-        for s_id, wh_id, q in self.assignments:
-            problem.get_warehouses()[wh_id].add_usage(q)
+        store_id = random.randint(0, len(self.by_store) - 1)
+        assignments = self.by_store[store_id]
+        if not assignments:
+            return None
+        source_wh_id = random.choice(list(assignments))
+        qty = assignments[source_wh_id]
         target_warehouses = []
-        for wh_id, warehouse in enumerate(problem.get_warehouses()):
-            if wh_id != source_wh_id and warehouse.get_remaining_capacity() > 0:
-                incompatible = any(
-                    store_id in problem.get_stores()[s_id].incompatible_stores
-                    for (s_id, wid, _) in self.assignments if wid == wh_id
-                )
-                if not incompatible:
-                    target_warehouses.append(wh_id)
+        for wh_id in self.candidate_warehouses(store_id):
+            if (wh_id != source_wh_id and self.get_remaining_capacity(wh_id) > 0
+                    and self.is_compatible(store_id, wh_id)):
+                target_warehouses.append(wh_id)
         if not target_warehouses:
-            return self
+            return None
         target_wh_id = random.choice(target_warehouses)
-        target_wh = problem.get_warehouses()[target_wh_id]
-        transfer_amount = random.randint(1, min(qty - 1, target_wh.get_remaining_capacity())) if qty > 1 else 0
-        if transfer_amount > 0:
-            new_assignments = []
-            for s_id, wh_id, q in self.assignments:
-                if s_id == store_id and wh_id == source_wh_id:
-                    new_assignments.append((s_id, wh_id, q - transfer_amount))
-                else:
-                    new_assignments.append((s_id, wh_id, q))
-            new_assignments.append((store_id, target_wh_id, transfer_amount))
-            self.assignments = new_assignments
-            for warehouse in problem.get_warehouses():
-                warehouse.current_usage = 0
-                warehouse.is_open = False
-            for s_id, wh_id, q in self.assignments:
-                problem.get_warehouses()[wh_id].add_usage(q)
-        return self
+        transfer_amount = random.randint(1, min(qty - 1, self.get_remaining_capacity(target_wh_id))) if qty > 1 else 0
+        if transfer_amount == 0:
+            return None
+        return Move('transfer', [
+            (store_id, source_wh_id, -transfer_amount),
+            (store_id, target_wh_id, transfer_amount)
+        ])
 
     def tweak_split_store_demand(self):
-        problem = self.problem
-        store_assignments = self.get_store_assignments()
-        if not store_assignments:
-            return self
-        single_assigned_stores = [
-            s_id for s_id, assignments in store_assignments.items()
-            if len(assignments) == 1 and assignments[0][1] > 1
-        ]
-        if not single_assigned_stores:
-            return self
-        store_id = random.choice(single_assigned_stores)
-        wh_id, qty = store_assignments[store_id][0]
-        for warehouse in problem.get_warehouses():
-            warehouse.current_usage = 0
-            warehouse.is_open = False
-        for s_id, w_id, q in self.assignments:
-            problem.get_warehouses()[w_id].add_usage(q)
+        if not self.split_stores:
+            return None
+        store_id = self.split_stores.choice()
+        (wh_id, qty), = self.by_store[store_id].items()
         target_warehouses = []
-        for new_wh_id, warehouse in enumerate(problem.get_warehouses()):
-            if new_wh_id != wh_id and warehouse.get_remaining_capacity() > 0:
-                incompatible = any(
-                    store_id in problem.get_stores()[s_id].incompatible_stores
-                    for (s_id, w, _) in self.assignments if w == new_wh_id
-                )
-                if not incompatible:
-                    target_warehouses.append(new_wh_id)
+        for new_wh_id in self.candidate_warehouses(store_id):
+            if (new_wh_id != wh_id and self.get_remaining_capacity(new_wh_id) > 0
+                    and self.is_compatible(store_id, new_wh_id)):
+                target_warehouses.append(new_wh_id)
         if not target_warehouses:
-            return self
+            return None
         target_wh_id = random.choice(target_warehouses)
-        target_wh = problem.get_warehouses()[target_wh_id]
-        split_amount = random.randint(1, min(qty - 1, target_wh.get_remaining_capacity()))
-        if split_amount > 0:
-            new_assignments = []
-            for s_id, w_id, q in self.assignments:
-                if s_id == store_id and w_id == wh_id:
-                    new_assignments.append((s_id, w_id, q - split_amount))
-                else:
-                    new_assignments.append((s_id, w_id, q))
-            new_assignments.append((store_id, target_wh_id, split_amount))
-            self.assignments = new_assignments
-            for warehouse in problem.get_warehouses():
-                warehouse.current_usage = 0
-                warehouse.is_open = False
-            for s_id, w_id, q in self.assignments:
-                problem.get_warehouses()[w_id].add_usage(q)
-        return self
+        split_amount = random.randint(1, min(qty - 1, self.get_remaining_capacity(target_wh_id)))
+        return Move('split', [
+            (store_id, wh_id, -split_amount),
+            (store_id, target_wh_id, split_amount)
+        ])
 
     def tweak_merge_store_assignments(self):
+        if not self.mergeable_stores:
+            return None
+        store_id = self.mergeable_stores.choice()
+        assignments = self.by_store[store_id]
+        source_wh_id, target_wh_id = random.sample(list(assignments), 2)
+        source_qty = assignments[source_wh_id]
+        return Move('merge', [
+            (store_id, source_wh_id, -source_qty),
+            (store_id, target_wh_id, source_qty)
+        ])
+
+    def _place(self, store_id, quantity, targets, remaining, blocked, closing):
+        """
+        Split `quantity` units of the store over `targets` (which must be sorted
+        cheapest supply cost first), skipping the `closing` warehouses and any
+        warehouse that is full or incompatible with the store. blocked[wh_id] holds
+        the stores incompatible with those added to wh_id by the same move. On
+        success, updates `remaining` and `blocked` and returns
+        [(warehouse_id, quantity)]; returns None, changing nothing, if the units do not fit.
+        """
+        placed = []
+        for wh_id in targets:
+            if wh_id in closing:
+                continue
+            if wh_id not in remaining:
+                remaining[wh_id] = self.get_remaining_capacity(wh_id)
+            if remaining[wh_id] <= 0 or not self.is_compatible(store_id, wh_id) or store_id in blocked.get(wh_id, ()):
+                continue
+            amount = min(quantity, remaining[wh_id])
+            placed.append((wh_id, amount))
+            quantity -= amount
+            if quantity == 0:
+                incompatible = self.problem.get_stores()[store_id].incompatible_stores
+                for target, amount in placed:
+                    remaining[target] -= amount
+                    blocked.setdefault(target, set()).update(incompatible)
+                return placed
+        return None
+
+    def drain_changes(self, wh_id, opened=None):
+        """
+        Changes that move every store supplied by `wh_id` elsewhere: to its
+        candidate warehouses that are open (or `opened`), and failing that to the
+        open ones among its longer fallback list (see
+        WarehouseLocationProblem.get_fallback_warehouses). Removals come first.
+        None if some store does not fit.
+        """
         problem = self.problem
-        store_assignments = self.get_store_assignments()
-        if not store_assignments:
-            return self
-        multi_assigned_stores = [
-            s_id for s_id, assignments in store_assignments.items()
-            if len(assignments) > 1
-        ]
-        if not multi_assigned_stores:
-            return self
-        store_id = random.choice(multi_assigned_stores)
-        assignments = store_assignments[store_id]
-        indices = random.sample(range(len(assignments)), 2)
-        source_wh_id, source_qty = assignments[indices[0]]
-        target_wh_id, target_qty = assignments[indices[1]]
-        new_assignments = []
-        for s_id, wh_id, qty in self.assignments:
-            if s_id == store_id and wh_id == source_wh_id:
-                pass
-            elif s_id == store_id and wh_id == target_wh_id:
-                new_assignments.append((s_id, wh_id, qty + source_qty))
-            else:
-                new_assignments.append((s_id, wh_id, qty))
-        self.assignments = new_assignments
-        for warehouse in problem.get_warehouses():
-            warehouse.current_usage = 0
-            warehouse.is_open = False
-        for s_id, wh_id, qty in self.assignments:
-            problem.get_warehouses()[wh_id].add_usage(qty)
-        return self
+        usage = self.usage
+        remaining = {}
+        blocked = {}
+        closing = {wh_id}
+        removals = []
+        additions = []
+        for store_id, qty in self.by_warehouse[wh_id].items():
+            targets = [w for w in problem.get_candidate_warehouses(store_id) if w == opened or usage[w] > 0]
+            placed = self._place(store_id, qty, targets, remaining, blocked, closing)
+            if placed is None:
+                targets = [w for w in problem.get_fallback_warehouses(store_id) if w == opened or usage[w] > 0]
+                placed = self._place(store_id, qty, targets, remaining, blocked, closing)
+                if placed is None:
+                    return None
+            removals.append((store_id, wh_id, -qty))
+            additions.extend((store_id, target, amount) for target, amount in placed)
+        return removals + additions
+
+    def tweak_close_warehouse(self):
+        """Close a random open warehouse, moving each of its stores to the cheapest open alternatives."""
+        if len(self.open_set) < 2:
+            return None
+        changes = self.drain_changes(self.open_set.choice())
+        return Move('close', changes) if changes else None
+
+    def tweak_open_warehouse(self):
+        """
+        Open a random closed warehouse and move to it the supply it makes cheaper,
+        most savings first, as far as its capacity and the incompatibilities allow.
+        """
+        problem = self.problem
+        num_warehouses = len(problem.get_warehouses())
+        if len(self.open_set) == num_warehouses:
+            return None
+        wh_id = random.randint(0, num_warehouses - 1)
+        while self.usage[wh_id] > 0:
+            wh_id = random.randint(0, num_warehouses - 1)
+        supply_cost = problem.get_supply_cost()
+        savings = []
+        for store_id in problem.get_candidate_stores(wh_id):
+            for source_wh_id, qty in self.by_store[store_id].items():
+                saving = supply_cost[store_id][source_wh_id] - supply_cost[store_id][wh_id]
+                if saving > 0:
+                    savings.append((saving, store_id, source_wh_id, qty))
+        savings.sort(reverse=True)
+
+        remaining = problem.get_warehouses()[wh_id].capacity
+        stores = problem.get_stores()
+        blocked = set()  # Stores incompatible with those already moved to the warehouse
+        changes = []
+        for saving, store_id, source_wh_id, qty in savings:
+            if remaining == 0:
+                break
+            if store_id in blocked:
+                continue
+            amount = min(qty, remaining)
+            changes.append((store_id, source_wh_id, -amount))
+            changes.append((store_id, wh_id, amount))
+            blocked.update(stores[store_id].incompatible_stores)
+            remaining -= amount
+        # Removals first, so no intermediate state exceeds a warehouse's capacity
+        changes.sort(key=lambda change: change[2])
+        return Move('open', changes) if changes else None
+
+    def tweak_swap_warehouses(self):
+        """
+        Close a random open warehouse and open a closed one that is a candidate
+        for one of its stores, moving the stores to whichever is cheapest.
+        """
+        if not self.open_set:
+            return None
+        wh_id = self.open_set.choice()
+        store_id = random.choice(list(self.by_warehouse[wh_id]))
+        closed = [w for w in self.candidate_warehouses(store_id) if self.usage[w] == 0]
+        if not closed:
+            return None
+        changes = self.drain_changes(wh_id, opened=random.choice(closed))
+        return Move('swap', changes) if changes else None
+
+def solution_from_assignments(problem, assignments):
+    """Build a Solution from 0-based (store_id, warehouse_id, quantity) assignments."""
+    solution = Solution(problem)
+    for store_id, wh_id, quantity in assignments:
+        solution.add_assignment(store_id, wh_id, quantity)
+    return solution
+
+def solution_state(solution):
+    """
+    The assignments of a solution together with the internal orderings that
+    random choices depend on, as lists of ints; solution_from_state rebuilds an
+    identical solution from it.
+    """
+    return {
+        'assignments': solution.assignments,
+        'warehouse_order': [(wh_id, store_id) for wh_id, stores in enumerate(solution.by_warehouse) for store_id in stores],
+        'split_stores': list(solution.split_stores.items),
+        'mergeable_stores': list(solution.mergeable_stores.items),
+        'open_set': list(solution.open_set.items),
+    }
+
+def solution_from_state(problem, state):
+    solution = solution_from_assignments(problem, state['assignments'])
+    solution.by_warehouse = [{} for _ in problem.get_warehouses()]
+    for wh_id, store_id in state['warehouse_order']:
+        solution.by_warehouse[wh_id][store_id] = solution.by_store[store_id][wh_id]
+    for name in ('split_stores', 'mergeable_stores', 'open_set'):
+        items = _RandomAccessSet()
+        for item in state[name]:
+            items.add(item)
+        setattr(solution, name, items)
+    return solution
+
+def load_solution(problem, file_path):
+    """
+    Read a solution file in triples format (as written by main.py) into a
+    Solution. Triples with quantity 0 are skipped; a ValueError is raised for
+    ids outside the instance.
+    """
+    num_stores, num_warehouses = len(problem.get_stores()), len(problem.get_warehouses())
+    assignments = []
+    for store_id, wh_id, quantity in read_solution_file(file_path):
+        if not (0 <= store_id < num_stores and 0 <= wh_id < num_warehouses):
+            raise ValueError(f"{file_path}: ({store_id + 1}, {wh_id + 1}, {quantity}) is outside the instance "
+                             f"({num_stores} stores, {num_warehouses} warehouses)")
+        if quantity:
+            assignments.append((store_id, wh_id, quantity))
+    return solution_from_assignments(problem, assignments)
@@ -0,0 +1,192 @@
+"""
+Transportation re-optimization: with the set of open warehouses fixed, choose
+the quantities by cancelling negative cycles in the residual graph.
+"""
+import time
+import numpy as np
+from solution import Move
+
+def _shift_graph(solution, warehouse_ids, supply_cost, banned):
+    """
+    Dense graph over warehouse_ids where edge (i, j) moves one unit of some
+    store from warehouse_ids[i] to warehouse_ids[j]. Returns (weights, stores):
+    the cheapest such shift per edge (inf if there is none) and the store making it.
+    """
+    m = len(warehouse_ids)
+    # allowed[s, j]: store s may be supplied by warehouse_ids[j]
+    allowed = np.ones(supply_cost.shape, dtype=bool)
+    for j, wh_id in enumerate(warehouse_ids):
+        blocked = list(solution.conflicts[wh_id])
+        if blocked:
+            allowed[blocked, j] = False
+    # One row per (store, warehouse) assignment, grouped by warehouse; open warehouses supply at least one store
+    supplied = []
+    group_sizes = []
+    for wh_id in warehouse_ids:
+        supplied.extend(solution.by_warehouse[wh_id])
+        group_sizes.append(len(solution.by_warehouse[wh_id]))
+    supplied = np.array(supplied, dtype=np.int64)
+    sources = np.repeat(np.arange(m), group_sizes)
+    starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+
+    shift = supply_cost[supplied] - supply_cost[supplied, sources][:, None]
+    shift[~allowed[supplied]] = np.inf
+    weights = np.minimum.reduceat(shift, starts, axis=0)
+    # The first row of each group that attains the minimum names the store
+    rows = np.where(shift == weights[sources], np.arange(len(supplied))[:, None], len(supplied))
+    first = np.minimum.reduceat(rows, starts, axis=0)
+    stores = np.where(first < len(supplied), supplied[np.minimum(first, len(supplied) - 1)], -1)
+    np.fill_diagonal(weights, np.inf)
+    if banned:
+        position = {wh_id: k for k, wh_id in enumerate(warehouse_ids)}
+        for from_wh, to_wh, store_id in banned:
+            i, j = position.get(from_wh), position.get(to_wh)
+            if i is not None and j is not None and stores[i, j] == store_id:
+                weights[i, j] = np.inf
+    return weights, stores
+
+def _cycle_in_predecessors(pred):
+    """A cycle in the predecessor graph as a list of nodes, or None."""
+    state = [0] * len(pred)  # 0: unvisited, 1: on the current walk, 2: done
+    for start in range(len(pred)):
+        walk = []
+        node = start
+        while node >= 0 and state[node] == 0:
+            state[node] = 1
+            walk.append(node)
+            node = pred[node]
+        if node >= 0 and state[node] == 1:
+            cycle = walk[walk.index(node):]
+            cycle.reverse()
+            return cycle
+        for visited in walk:
+            state[visited] = 2
+    return None
+
+def _find_negative_cycle(weights, check_interval=4, deadline=None):
+    """
+    Bellman-Ford from a virtual source; returns a negative cycle as a list of
+    nodes, or None. Any cycle in the predecessor graph is negative, so it is
+    looked for every `check_interval` rounds instead of running all n rounds.
+    Also returns None once time.time() passes `deadline`.
+    """
+    n = len(weights)
+    dist = np.zeros(n)
+    pred = np.full(n, -1, dtype=np.int64)
+    columns = np.arange(n)
+    for round_number in range(1, n + 1):
+        candidates = dist[:, None] + weights
+        best = candidates.argmin(axis=0)
+        new_dist = candidates[best, columns]
+        improved = new_dist < dist
+        if not improved.any():
+            return None
+        dist[improved] = new_dist[improved]
+        pred[improved] = best[improved]
+        if round_number % check_interval == 0 or round_number == n:
+            cycle = _cycle_in_predecessors(pred.tolist())
+            if cycle is not None:
+                return cycle
+            if deadline is not None and time.time() >= deadline:
+                return None
+    return None
+
+def _push_along(solution, edges, end_slack, warehouse_ids, stores):
+    """Shift as many units as possible along the edges of a cycle; True if the cost went down."""
+    drained = {}
+    for i, j in edges:
+        key = (int(stores[i, j]), warehouse_ids[i])
+        drained[key] = drained.get(key, 0) + 1
+    amount = min(solution.by_store[store_id][wh_id] // count for (store_id, wh_id), count in drained.items())
+    if end_slack is not None:
+        amount = min(amount, int(end_slack))
+    if amount <= 0:
+        return False
+
+    changes = []
+    for i, j in edges:
+        store_id = int(stores[i, j])
+        changes.append((store_id, warehouse_ids[i], -amount))
+        changes.append((store_id, warehouse_ids[j], amount))
+    move = Move('transport', changes)
+    solution.apply_move(move)
+    is_valid, _ = solution.check_move(move)
+    if is_valid and move.delta < 0:
+        return True
+    solution.undo_move(move)
+    return False
+
+def reoptimize_flows(solution, max_rounds=None, time_limit_seconds=None):
+    """
+    Re-optimize the quantities of `solution` in place for its current set of
+    open warehouses, and return the change in cost (<= 0).
+
+    Each round builds the graph of store shifts between open warehouses and
+    cancels its negative-cost cycles (chains that end in a warehouse with
+    spare capacity, or closed loops such as swaps), pushing as much flow
+    along each as the quantities and capacities allow. Without
+    incompatibilities the result is an optimal transportation plan. A store
+    is only shifted into warehouses it is compatible with, so the solution
+    stays feasible throughout; a warehouse whose flow drops to zero closes,
+    which only lowers the cost. max_rounds bounds the number of rounds, and
+    time_limit_seconds the time; each round costs O(m^2) per Bellman-Ford
+    pass over the m open warehouses, so large instances need one. The
+    solution stays feasible when the search is cut short.
+    """
+    deadline = None if time_limit_seconds is None else time.time() + time_limit_seconds
+    arrays = solution.problem.get_arrays()
+    banned = set()
+    cost_before = solution.cost()
+    rounds = 0
+
+    while max_rounds is None or rounds < max_rounds:
+        if deadline is not None and time.time() >= deadline:
+            break
+        rounds += 1
+        # Warehouses emptied by an earlier round have closed and are left out
+        warehouse_ids = solution.get_open_warehouses()
+        m = len(warehouse_ids)
+        if m < 2:
+            break
+        supply_cost = arrays.supply_cost[:, warehouse_ids].astype(np.float64)
+        capacity = arrays.capacity[warehouse_ids]
+        shifts, stores = _shift_graph(solution, warehouse_ids, supply_cost, banned)
+        # Node m is a hub: any warehouse can give up a unit, any warehouse with spare capacity can take one
+        weights = np.full((m + 1, m + 1), np.inf)
+        weights[:m, :m] = shifts
+        weights[m, :m] = 0
+        slack = capacity - np.array([solution.usage[wh_id] for wh_id in warehouse_ids])
+        weights[:m, m][slack > 0] = 0
+
+        cycle = _find_negative_cycle(weights, deadline=deadline)
+        if cycle is None:
+            break
+        while cycle is not None:
+            # Rotate so a path through the hub starts right after it
+            if m in cycle:
+                k = cycle.index(m)
+                cycle = cycle[k + 1:] + cycle[:k]
+                edges = list(zip(cycle, cycle[1:]))
+                end_slack = slack[cycle[-1]]
+            else:
+                edges = list(zip(cycle, cycle[1:] + cycle[:1]))
+                end_slack = None
+
+            if _push_along(solution, edges, end_slack, warehouse_ids, stores):
+                # Shifts between untouched warehouses are unchanged, so the rest of the graph stays usable
+                for node in cycle:
+                    if node == m:
+                        continue
+                    weights[node, :] = np.inf
+                    weights[:, node] = np.inf
+            else:
+                # The cycle cannot be used as is (it reuses a store's last units, or two stores
+                # it moves conflict); drop its first shift and look again
+                i, j = edges[0]
+                banned.add((warehouse_ids[i], warehouse_ids[j], int(stores[i, j])))
+                weights[i, j] = np.inf
+            cycle = _find_negative_cycle(weights, deadline=deadline)
+            if deadline is not None and time.time() >= deadline:
+                break
+
+    return solution.cost() - cost_before
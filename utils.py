@@ -1,3 +1,7 @@
+import json
+import re
+import numpy as np
+
 def order_stores_by_demand(stores):
     """Sort stores by demand (highest first)."""
     store_ids = list(range(len(stores)))
@@ -9,3 +13,21 @@ def order_warehouses_by_cost_efficiency(warehouses):
     warehouse_ids = list(range(len(warehouses)))
     warehouse_ids.sort(key=lambda i: warehouses[i].fixed_cost / warehouses[i].capacity)
     return warehouse_ids
+
+def read_solution_file(file_path):
+    """
+    Read a solution in triples format, {(store, warehouse, quantity), ...} with
+    1-based ids, and return it as a list of 0-based (store_id, warehouse_id, quantity).
+    The compact .json and .npz files written by report.write_solution are read too.
+    """
+    if file_path.endswith('.npz'):
+        with np.load(file_path) as data:
+            triples = data['triples'].tolist()
+    elif file_path.endswith('.json'):
+        with open(file_path, 'r') as file:
+            triples = json.load(file)['triples']
+    else:
+        with open(file_path, 'r') as file:
+            content = file.read()
+        triples = re.findall(r'\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)', content)
+    return [(int(store) - 1, int(warehouse) - 1, int(quantity)) for store, warehouse, quantity in triples]
@@ -1,3 +1,25 @@
+"""
+Validation of warehouse location solutions. Run as a script to check
+solution files against their instances without the C++ WL_Validator:
+
+    python validator.py PublicInstances/wlp01.dzn solutions/wlp01/solution.txt
+    python validator.py --tree solutions --instances-dir PublicInstances --jobs 4
+
+With --tree, every solution.txt/.json/.npz below the directory is checked
+against <instances-dir>/<name>.dzn, where <name> is the first directory
+below the tree (solutions/wlp01/solution.txt and
+tmp/solution/wlp01/<timestamp>/solution.txt both belong to wlp01).
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from parser import load_arrays
+from utils import read_solution_file
+
+SOLUTION_FILES = ('solution.txt', 'solution.json', 'solution.npz')
+
 def validate_solution(problem, solution):
     """
     Validate if a solution respects:
@@ -5,43 +27,160 @@ def validate_solution(problem, solution):
     2. The total quantity of goods brought to a store must be exactly equal to its request
     3. Goods can be moved only from open warehouses
     4. Two incompatible stores cannot be supplied by the same warehouse
-    
+
     Returns a tuple (is_valid, error_message)
     """
-    warehouses = problem.get_warehouses()
-    stores = problem.get_stores()
-    
-    # Check warehouse capacity constraints
-    for wh in warehouses:
-        if wh.current_usage > wh.capacity:
-            return False, f"Warehouse {wh.id+1} is overloaded: {wh.current_usage} > {wh.capacity}"
-    
+    return validate_assignments(problem.get_arrays(), solution.assignments)
+
+def validate_assignments(arrays, assignments):
+    """
+    Check a list of 0-based (store_id, warehouse_id, quantity) assignments
+    against the ProblemArrays of an instance using vectorized array operations.
+
+    Returns a tuple (is_valid, error_message)
+    """
+    num_warehouses = arrays.num_warehouses
+    triples = np.asarray(assignments, dtype=np.int64).reshape(-1, 3)
+    store_ids, wh_ids, quantities = triples[:, 0], triples[:, 1], triples[:, 2]
+
+    # Check that every id names a store and a warehouse of the instance
+    out_of_range = np.flatnonzero((store_ids < 0) | (store_ids >= arrays.num_stores) |
+                                  (wh_ids < 0) | (wh_ids >= num_warehouses))
+    if out_of_range.size:
+        i = out_of_range[0]
+        return False, f"Assignment of store {store_ids[i]+1} to warehouse {wh_ids[i]+1} is out of range"
+
+    # Check warehouse capacity constraints (usage is recomputed, not taken from the solution)
+    usage = np.bincount(wh_ids, weights=quantities, minlength=num_warehouses).astype(np.int64)
+    overloaded = np.flatnonzero(usage > arrays.capacity)
+    if overloaded.size:
+        wh_id = overloaded[0]
+        return False, f"Warehouse {wh_id+1} is overloaded: {usage[wh_id]} > {arrays.capacity[wh_id]}"
+
     # Check if all store demands are satisfied exactly
-    store_assignments = solution.get_store_assignments()
-    for store_id, store in enumerate(stores):
-        total_assigned = sum(qty for _, qty in store_assignments.get(store_id, []))
-        if total_assigned != store.demand:
-            return False, f"Store {store_id+1} demand not satisfied: {total_assigned} ≠ {store.demand}"
-    
-    # Check that goods are only moved from open warehouses
-    for store_id, wh_id, quantity in solution.assignments:
-        if not warehouses[wh_id].is_open:
-            return False, f"Goods are moved from closed warehouse {wh_id+1} to store {store_id+1}"
-    
-    # Check incompatibility constraints
-    # Group stores by warehouse
-    warehouse_stores = {}
-    for store_id, wh_id, _ in solution.assignments:
-        if wh_id not in warehouse_stores:
-            warehouse_stores[wh_id] = set()
-        warehouse_stores[wh_id].add(store_id)
-    
-    # Check for incompatible stores assigned to the same warehouse
-    for wh_id, store_set in warehouse_stores.items():
-        for store_id in store_set:
-            store = stores[store_id]
-            for incomp_store_id in store.incompatible_stores:
-                if incomp_store_id in store_set:
-                    return False, f"Incompatible stores {store_id+1} and {incomp_store_id+1} are assigned to the same warehouse {wh_id+1}"
-    
-    return True, "Solution is valid"
\ No newline at end of file
+    supplied = np.bincount(store_ids, weights=quantities, minlength=arrays.num_stores).astype(np.int64)
+    unsatisfied = np.flatnonzero(supplied != arrays.demand)
+    if unsatisfied.size:
+        store_id = unsatisfied[0]
+        return False, f"Store {store_id+1} demand not satisfied: {supplied[store_id]} ≠ {arrays.demand[store_id]}"
+
+    # Check that every assignment moves a positive quantity
+    nonpositive = np.flatnonzero(quantities <= 0)
+    if nonpositive.size:
+        i = nonpositive[0]
+        return False, f"Assignment of store {store_ids[i]+1} to warehouse {wh_ids[i]+1} has nonpositive quantity {quantities[i]}"
+
+    # Check that goods are only moved from open warehouses (a warehouse is open when goods are taken from it)
+    closed = np.flatnonzero(usage[wh_ids] <= 0)
+    if closed.size:
+        i = closed[0]
+        return False, f"Goods are moved from closed warehouse {wh_ids[i]+1} to store {store_ids[i]+1}"
+
+    # Check incompatibility constraints: expand every assignment (s, w) to the
+    # pairs (n, w) for each store n incompatible with s, and look them up among
+    # the assigned (store, warehouse) keys
+    indptr, indices = arrays.incompat_indptr, arrays.incompat_indices
+    degrees = indptr[store_ids + 1] - indptr[store_ids]
+    total = int(degrees.sum())
+    if total:
+        owner = np.repeat(np.arange(len(store_ids)), degrees)
+        offsets = np.arange(total) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+        neighbours = indices[indptr[store_ids][owner] + offsets].astype(np.int64)
+        assigned_keys = store_ids * num_warehouses + wh_ids
+        clashes = np.flatnonzero(np.isin(neighbours * num_warehouses + wh_ids[owner], assigned_keys))
+        if clashes.size:
+            i = owner[clashes[0]]
+            return False, f"Incompatible stores {store_ids[i]+1} and {neighbours[clashes[0]]+1} are assigned to the same warehouse {wh_ids[i]+1}"
+
+    return True, "Solution is valid"
+
+def assignment_costs(arrays, assignments):
+    """
+    (total_cost, supply_cost, opening_cost) of a list of 0-based
+    (store_id, warehouse_id, quantity) assignments, recomputed from the arrays.
+    """
+    triples = np.asarray(assignments, dtype=np.int64).reshape(-1, 3)
+    store_ids, wh_ids, quantities = triples[:, 0], triples[:, 1], triples[:, 2]
+    supply_cost = int((arrays.supply_cost[store_ids, wh_ids].astype(np.int64) * quantities).sum())
+    opened = np.zeros(arrays.num_warehouses, dtype=bool)
+    opened[wh_ids[quantities > 0]] = True
+    opening_cost = int(arrays.fixed_cost[opened].sum())
+    return supply_cost + opening_cost, supply_cost, opening_cost
+
+def validate_file(instance_path, solution_path, use_cache=False):
+    """
+    Check a solution file (triples format, .json or .npz) against a .dzn
+    instance. Returns a dict with the validity, the message and, for valid
+    solutions, the costs. With use_cache=True the parsed instance is read from
+    (or written to) the .npz cache next to it (see parser.load_arrays).
+    """
+    result = {'instance': instance_path, 'solution': solution_path}
+    try:
+        arrays, _ = load_arrays(instance_path, use_cache)
+        assignments = read_solution_file(solution_path)
+    except (OSError, ValueError, KeyError) as e:
+        result.update(valid=False, message=f"Cannot read: {e}")
+        return result
+    is_valid, message = validate_assignments(arrays, assignments)
+    result.update(valid=is_valid, message=message)
+    if is_valid:
+        result['cost'], result['supply_cost'], result['opening_cost'] = assignment_costs(arrays, assignments)
+    return result
+
+def find_solutions(root, instances_dir):
+    """(instance_path, solution_path) for every solution file below root."""
+    pairs = []
+    for directory, _, files in os.walk(root):
+        relative = os.path.relpath(directory, root)
+        if relative == os.curdir:
+            continue
+        name = relative.split(os.sep)[0]
+        for file_name in files:
+            if file_name in SOLUTION_FILES:
+                pairs.append((os.path.join(instances_dir, f"{name}.dzn"), os.path.join(directory, file_name)))
+    return sorted(pairs)
+
+def validate_tree(root, instances_dir, jobs=None, use_cache=False):
+    """Validate every solution file below root in a process pool; returns the result dicts."""
+    pairs = find_solutions(root, instances_dir)
+    if not pairs:
+        return []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(validate_file, *zip(*pairs), [use_cache] * len(pairs)))
+
+def format_result(result):
+    if not result['valid']:
+        return f"{result['solution']}: INVALID - {result['message']}"
+    return (f"{result['solution']}: valid, cost {result['cost']} = {result['supply_cost']} (supply cost) + "
+            f"{result['opening_cost']} (opening cost)")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('files', nargs='*', help='<instance.dzn> <solution file>')
+    arg_parser.add_argument('--tree', help='validate every solution file below this directory')
+    arg_parser.add_argument('--instances-dir', default='PublicInstances')
+    arg_parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU core)')
+    arg_parser.add_argument('--cache', action='store_true',
+                            help='read parsed instances from, and write them to, .npz caches next to the .dzn files')
+    args = arg_parser.parse_args()
+
+    if args.tree:
+        if args.files:
+            arg_parser.error("Pass either --tree or an instance and a solution file")
+        results = validate_tree(args.tree, args.instances_dir, args.jobs, args.cache)
+        if not results:
+            arg_parser.error(f"No solution files below {args.tree}")
+    elif len(args.files) == 2:
+        results = [validate_file(*args.files, use_cache=args.cache)]
+    else:
+        arg_parser.error("Pass an instance and a solution file, or --tree")
+
+    for result in results:
+        print(format_result(result))
+    invalid = sum(not result['valid'] for result in results)
+    if len(results) > 1:
+        print(f"\n{len(results) - invalid}/{len(results)} solutions valid")
+    sys.exit(1 if invalid else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+State shared by the worker processes of the parallel solvers (grasp.py and
+multistart.py). Every worker receives the problem once, through init_worker
+as the pool initializer. Only assignments travel back, and the parent, which
+already holds the problem, rebuilds the solutions with rebuild_solution.
+"""
+from solution import solution_from_assignments
+
+# Set in every worker process by init_worker; the problem is read-only there
+_problem = None
+_progress = None
+
+def init_worker(problem, progress=None):
+    global _problem, _progress
+    _problem = problem
+    _progress = progress
+
+def worker_problem():
+    return _problem
+
+def worker_progress():
+    """The queue passed to init_worker, for reporting progress to the parent."""
+    return _progress
+
+def rebuild_solution(assignments, problem=None):
+    """A Solution from assignments, against `problem` or, by default, the worker's problem."""
+    return solution_from_assignments(problem if problem is not None else _problem, assignments)